@@ -0,0 +1,560 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+#Load a Script as a Module (File Names contain a Space)
+def load_script(script_dir, file_name, module_name):
+    path = os.path.join(script_dir, file_name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+#Synthetic Responses with Single, Multiple and Unmatched Names
+def synthetic_responses(rows, name_list, column, seed = 0):
+    rng = np.random.default_rng(seed)
+    first = rng.choice(name_list, rows)
+    second = rng.choice(name_list, rows)
+    kind = rng.integers(0, 10, rows)
+    names = np.where(kind == 0, first + ' and ' + second,
+            np.where(kind == 1, first + ' & ' + second,
+            np.where(kind == 2, 'Friendly and helpful', first)))
+    return pd.DataFrame({
+        'Timestamp': pd.Timestamp(datetime.now().year, 1, 1) + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit = 's'),
+        'Rating': rng.integers(1, 6, rows),
+        column: names,
+        'Enquiry ID': rng.integers(500000, 700000, rows),
+    })
+
+#Row-by-Row cleanup() as Shipped before the Column-Wise Splitting Engine
+def legacy_cleanup(df, column, separators = ['and', '&']):
+    new_rows = []
+    for index, row in df.iterrows():
+        names = [row[column]]
+        for separator in separators:
+            temp_names = []
+            for name in names:
+                temp_names.extend(name.split(f' {separator} '))
+            names = [name.strip() for name in temp_names]
+        if len(names) > 1:
+            for name in names:
+                new_row = row.copy()
+                new_row[column] = name
+                new_rows.append(new_row)
+        else:
+            new_rows.append(row)
+    return pd.DataFrame(new_rows)
+
+#Row-by-Row update_name() as Shipped before the Compiled Name Matcher
+def legacy_update_name(df, name_list, column):
+    for index, row in df.iterrows():
+        changed = False
+        name = row[column]
+        for match in name_list:
+            if match.lower() in name.lower():
+                df.loc[index, column] = match
+                changed = True
+                break
+        if changed == False:
+            df.loc[index, column] = 'No Name'
+
+#Four Filtered pivot_table() Calls as Shipped before the Single-Pass Aggregation
+def legacy_create_pivot_table(df, value, index, column):
+    pivot_tables = []
+    for quarter in [1, 2, 3, 4]:
+        df_q = df[df['Quarter'] == quarter]
+        pivot_table = pd.pivot_table(df_q, values = value, index = index, columns = column,
+                                     aggfunc = 'count', fill_value = 0)
+        pivot_tables.append(pivot_table.reset_index())
+    return pivot_tables
+
+#process() as Shipped before the Date-Attribute Quarter and Month
+def legacy_month_to_quarter(month):
+    if month in ['January', 'February', 'March']:
+        return 1
+    elif month in ['April', 'May', 'June']:
+        return 2
+    elif month in ['July', 'August', 'September']:
+        return 3
+    elif month in ['October', 'November', 'December']:
+        return 4
+
+def legacy_process(data):
+    data = data[data['Timestamp'].dt.year == datetime.now().year].copy()
+    data['Month'] = pd.to_datetime(data['Timestamp'], format = '%d/%m/%y', errors = 'coerce').dt.strftime('%B')
+    data['Quarter'] = data['Month'].apply(legacy_month_to_quarter)
+    return data
+
+#calculate_weighted_scores() as Shipped before the Matrix-Vector Product
+def legacy_calculate_weighted_scores(df):
+    weights = {'1': 1, '2': 2, '3': 3, '4': 4, '5': 5}
+    weighted_scores = []
+    for index, row in df.iterrows():
+        weighted_score = 0
+        for col_name in df.columns[1:]:
+            if pd.api.types.is_numeric_dtype(df[col_name]):
+                weighted_score += row[col_name] * weights.get(str(col_name), 0)
+        weighted_scores.append(weighted_score)
+    df['Weighted_Score'] = weighted_scores
+    return df
+
+#Best of Several Runs
+def timed(function, *args, repeat = 3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+#Compare the Legacy Loop with the Vectorized cleanup()
+def bench_cleanup(pipeline, sizes, legacy_limit = 20000):
+    column = 'Sales Executive'
+    name_list = ['Jasmine', 'Zhengjun', 'Jun', 'Jezelle', 'Leng Kiat', "A'rif Alimi"]
+    print(f"{'cleanup()':<24}{'rows':>10}{'legacy (s)':>14}{'vectorized (s)':>16}{'speedup':>10}")
+    for rows in sizes:
+        df = synthetic_responses(rows, name_list, column)
+        new_time, new_df = timed(pipeline.cleanup, df, column)
+        if rows <= legacy_limit:
+            old_time, old_df = timed(legacy_cleanup, df, column, repeat = 1)
+            pd.testing.assert_frame_equal(old_df, new_df, check_dtype = False)
+            print(f"{'':<24}{rows:>10}{old_time:>14.4f}{new_time:>16.4f}{old_time / new_time:>9.1f}x")
+        else:
+            print(f"{'':<24}{rows:>10}{'-':>14}{new_time:>16.4f}{'-':>10}")
+
+#Compare the Legacy Scan with the Compiled Matcher as the Roster Grows
+def bench_update_name(pipeline, sizes, rosters = [25, 100, 400], legacy_limit = 5000):
+    column = 'Sales Executive'
+    print(f"{'update_name()':<14}{'roster':>10}{'rows':>10}{'legacy (s)':>14}{'compiled (s)':>16}{'speedup':>10}")
+    for roster in rosters:
+        name_list = [f'Executive {i:03d}' for i in range(roster)]
+        for rows in sizes:
+            df = synthetic_responses(rows, name_list, column)
+            df = pipeline.cleanup(df, column).reset_index(drop = True)
+            new_time, _ = timed(lambda: pipeline.update_name(df.copy(), name_list, column))
+            if rows <= legacy_limit:
+                old_df = df.copy()
+                old_time, _ = timed(legacy_update_name, old_df, name_list, column, repeat = 1)
+                new_df = df.copy()
+                pipeline.update_name(new_df, name_list, column)
+                pd.testing.assert_frame_equal(old_df, new_df, check_dtype = False)
+                print(f"{'':<14}{roster:>10}{rows:>10}{old_time:>14.4f}{new_time:>16.4f}{old_time / new_time:>9.1f}x")
+            else:
+                print(f"{'':<14}{roster:>10}{rows:>10}{'-':>14}{new_time:>16.4f}{'-':>10}")
+
+#Compare Four pivot_table() Calls with One groupby() Pass
+def bench_pivot(pipeline, sizes):
+    column = 'Sales Executive'
+    name_list = [f'Executive {i:03d}' for i in range(50)]
+    print(f"{'create_pivot_table()':<24}{'rows':>10}{'legacy (s)':>14}{'single pass (s)':>16}{'speedup':>10}")
+    for rows in sizes:
+        df = synthetic_responses(rows, name_list, column)
+        df['Quarter'] = df['Timestamp'].dt.quarter
+        old_time, old_tables = timed(legacy_create_pivot_table, df, 'Enquiry ID', column, 'Rating')
+        new_time, new_tables = timed(pipeline.create_pivot_table, df, 'Enquiry ID', column, 'Rating')
+        for old_table, new_table in zip(old_tables, new_tables):
+            pd.testing.assert_frame_equal(old_table, new_table)
+        print(f"{'':<24}{rows:>10}{old_time:>14.4f}{new_time:>16.4f}{old_time / new_time:>9.1f}x")
+
+#Compare strftime() and apply() with the Date Attributes in process()
+def bench_process(pipeline, sizes):
+    name_list = ['Jasmine', 'Zhengjun', 'Jun']
+    print(f"{'process()':<24}{'rows':>10}{'legacy (s)':>14}{'attributes (s)':>16}{'speedup':>10}")
+    pd.options.mode.chained_assignment = None
+    for rows in sizes:
+        df = synthetic_responses(rows, name_list, 'Sales Executive')
+        old_time, old_df = timed(legacy_process, df)
+        new_time, new_df = timed(pipeline.process, df)
+        pd.testing.assert_frame_equal(old_df, new_df.astype({'Month': str}), check_dtype = False)
+        print(f"{'':<24}{rows:>10}{old_time:>14.4f}{new_time:>16.4f}{old_time / new_time:>9.1f}x")
+    pd.options.mode.chained_assignment = 'warn'
+
+#Time of Roll-Ups Sliced out of the Metrics Cube, against Re-Pivoting the Cleaned Responses
+def bench_cube(pipeline, sizes, repeat = 1000):
+    column = 'Sales Executive'
+    name_list = [f'Executive {i:03d}' for i in range(50)]
+    print(f"{'metrics cube':<24}{'rows':>10}{'re-pivot (ms)':>14}{'table (ms)':>16}{'metrics (ms)':>14}")
+    for rows in sizes:
+        df = pipeline.filter([(synthetic_responses(rows, name_list, column), column, name_list)])[0]
+        counts = pipeline.count_responses(df, 'Enquiry ID', column, 'Rating')
+        cube = pipeline.build_cube({'SG': counts, 'MY': counts, 'TH': counts})
+        pivot_time, _ = timed(pd.pivot_table, df, 'Enquiry ID', column, 'Rating', 'count', 0)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            pipeline.cube_table(cube, 'SG', months = [4, 5, 6])
+        table_time = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            pipeline.cube_metrics(cube, 'SG', executives = name_list[:1])
+        metrics_time = (time.perf_counter() - start) / repeat
+        print(f"{'':<24}{rows:>10}{pivot_time * 1000:>14.3f}{table_time * 1000:>16.3f}{metrics_time * 1000:>14.3f}")
+
+#Time and Peak Python Memory of create_excel() for each Export Backend
+#Memory is Traced in a Separate Run, as tracemalloc Slows the Export Down
+def bench_export(pipeline, sizes, engines = ['openpyxl', 'write-only']):
+    column = 'Sales Executive'
+    name_list = [f'Executive {i:03d}' for i in range(50)]
+    print(f"{'create_excel()':<16}{'engine':>12}{'rows':>10}{'time (s)':>12}{'peak (MB)':>12}")
+    for rows in sizes:
+        df = pipeline.process(synthetic_responses(rows, name_list, column))
+        pivots = pipeline.create_pivot_table(df, 'Enquiry ID', column, 'Rating')
+        countries_pivots = {country: pivots for country in pipeline.COUNTRIES}
+        countries_df = {country: df for country in pipeline.COUNTRIES}
+        for engine in engines:
+            with tempfile.TemporaryDirectory() as output_dir:
+                elapsed, _ = timed(pipeline.create_excel, output_dir, countries_pivots, countries_df, engine, repeat = 1)
+                tracemalloc.start()
+                pipeline.create_excel(output_dir, countries_pivots, countries_df, engine)
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            print(f"{'':<16}{engine:>12}{rows:>10}{elapsed:>12.2f}{peak:>12.1f}")
+
+#Time to Open the Summary and Read one Sheet, from the Workbook with pandas against the Memory-Mapped Summary Store
+def bench_store(pipeline, sizes, repeat = 1000):
+    column = 'Sales Executive'
+    name_list = [f'Executive {i:03d}' for i in range(50)]
+    print(f"{'summary store':<24}{'rows':>10}{'workbook (ms)':>14}{'open (ms)':>16}{'sheet (ms)':>14}")
+    for rows in sizes:
+        df = pipeline.filter([(synthetic_responses(rows, name_list, column), column, name_list)])[0]
+        counts = pipeline.count_responses(df, 'Enquiry ID', column, 'Rating')
+        cube = pipeline.build_cube({country: counts for country in pipeline.COUNTRIES}, pipeline.report_quarters())
+        pivots = {country: pipeline.create_pivot_table(df, 'Enquiry ID', column, 'Rating', cube, country) for country in pipeline.COUNTRIES}
+        with tempfile.TemporaryDirectory() as output_dir:
+            pipeline.create_excel(output_dir, pivots, {})
+            pipeline.write_store(output_dir, cube)
+            workbook_time, _ = timed(pd.read_excel, os.path.join(output_dir, 'NPS Quarterly Summary.xlsx'), 'SG Q2')
+            open_time, (stored, _) = timed(pipeline.read_store, output_dir)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                pipeline.cube_table(stored, 'SG', months = [4, 5, 6])
+            sheet_time = (time.perf_counter() - start) / repeat
+            del stored
+        print(f"{'':<24}{rows:>10}{workbook_time * 1000:>14.3f}{open_time * 1000:>16.3f}{sheet_time * 1000:>14.3f}")
+
+#Compare the Memory of each Country's Cleaned Responses with every Column and Default Types, against the Lean Columns and Types
+def bench_memory(pipeline, sizes):
+    print(f"{'cleaned responses':<24}{'rows':>10}{'country':>8}{'full (MB)':>12}{'lean (MB)':>12}{'saving':>10}")
+    pd.options.mode.chained_assignment = None
+    for rows in sizes:
+        for position, (country, schema) in enumerate(pipeline.SCHEMAS.items()):
+            column, sales_list = schema['headers']['executive'], schema['sales']
+            survey = synthetic_survey(pipeline, position, rows)
+            full = pipeline.process(survey)
+            full[column] = full[column].astype(str)
+            full = pipeline.cleanup(full, column)
+            pipeline.update_name(full, sales_list, column)
+            lean = pipeline.filter([(survey[pipeline.schema_columns(schema, survey.columns)], column, sales_list)])[0]
+            full_mb = full.memory_usage(deep = True).sum() / 2 ** 20
+            lean_mb = lean.memory_usage(deep = True).sum() / 2 ** 20
+            print(f"{'':<24}{rows:>10}{country:>8}{full_mb:>12.1f}{lean_mb:>12.1f}{full_mb / lean_mb:>9.1f}x")
+    pd.options.mode.chained_assignment = 'warn'
+
+#Compare the Row Loop with the Matrix-Vector Weighted Score on Growing Pivot Tables
+def bench_weighted_scores(dashboard, sizes):
+    print(f"{'weighted scores':<24}{'rows':>10}{'legacy (s)':>14}{'vectorized (s)':>16}{'speedup':>10}")
+    rng = np.random.default_rng(0)
+    for rows in sizes:
+        df = pd.DataFrame(rng.integers(0, 100, (rows, 5)), columns = [1, 2, 3, 4, 5])
+        df.insert(0, 'Sales Executive', [f'Executive {i}' for i in range(rows)])
+        df['Total'] = df[[1, 2, 3, 4, 5]].sum(axis = 1)
+        old_time, old_df = timed(lambda: legacy_calculate_weighted_scores(df.copy()), repeat = 1)
+        new_time, new_df = timed(lambda: dashboard.calculate_weighted_scores(df.copy()))
+        pd.testing.assert_frame_equal(old_df, new_df)
+        print(f"{'':<24}{rows:>10}{old_time:>14.4f}{new_time:>16.4f}{old_time / new_time:>9.1f}x")
+
+#Recommendation, Comment and Extra Columns of each Survey, besides the Columns the Pipeline Reads
+SURVEY_COLUMNS = [
+    (('Would you recommend Motorist to your family/friends?', 'Yes', 'No'),
+     'OPTIONAL: Please leave additional comments, if you have any',
+     ['Unnamed: 6', 'Unnamed: 7']),
+    (('Would you recommend Motorist to your family/friends?\nAdakah anda akan mengesyorkan Motorist pada rakan/keluarga?', 'Yes/Ya', 'No/Tidak'),
+     'OPTIONAL: Please leave additional comments, if you have any\nPILIHAN: Sila tinggalkan komen tambahan anda, jika ada',
+     ['Customer Response', 'MB Comments']),
+    (('ท่านคิดว่าจะแนะนำมอเตอริสต์ให้กับเพื่อน/คนในครอบครัวหรือไม่', 'ใช่', 'ไม่'),
+     'กรุณากรอกความคิดเห็นเพิ่มเติม(ถ้ามี)',
+     []),
+]
+COMMENTS = ['Very helpful and fast', 'Price was lower than expected', 'Good service', 'Terima kasih', 'บริการดีมาก']
+
+#Synthetic Survey Sheet of a Country, with its Real Column Headers in Form Order
+def synthetic_survey(pipeline, position, rows, seed = 0):
+    schema = list(pipeline.SCHEMAS.values())[position]
+    column, enquiry, rating = [schema['headers'][field] for field in ['executive', 'enquiry_id', 'rating']]
+    sales_list = schema['sales']
+    (recommend, yes, no), comment, extras = SURVEY_COLUMNS[position]
+    responses = synthetic_responses(rows, np.array(sales_list), column, seed + position)
+    rng = np.random.default_rng(seed + position)
+    survey = pd.DataFrame({
+        'Timestamp': responses['Timestamp'],
+        rating: responses['Rating'],
+        recommend: np.where(responses['Rating'] >= 4, yes, no),
+        comment: np.where(rng.random(rows) < 0.2, rng.choice(COMMENTS, rows), None),
+        column: responses[column],
+        enquiry: responses['Enquiry ID'],
+    })
+    for extra in extras:
+        survey[extra] = None
+    return survey
+
+#Write SG, MY and TH Response Workbooks of the Given Size, Reusing them once Written
+def write_survey_workbooks(pipeline, folder, rows, seed = 0):
+    paths = pipeline.survey_paths(folder)
+    if all(os.path.exists(path) for path in paths):
+        return paths
+    os.makedirs(folder, exist_ok = True)
+    from openpyxl import Workbook
+    for position, path in enumerate(paths):
+        print(f"Writing {rows} synthetic responses to {os.path.basename(path)}...")
+        workbook = Workbook(write_only = True)
+        pipeline.stream_sheet(workbook, synthetic_survey(pipeline, position, rows, seed), 'Form Responses 1')
+        workbook.save(path)
+    return paths
+
+#Run NPS Excel.py End to End in a Fresh Process on a Folder of Surveys and Return its Timing Report
+#The Cache is Cleared First, so the Surveys are Parsed Once and the Raw Sheets Read Back from the Cache
+def run_pipeline(script_dir, folder, options = []):
+    subprocess.run([sys.executable, os.path.join(script_dir, 'NPS Excel.py'), '--data-dir', folder, '--clear-cache', *options],
+                   check = True, stdout = subprocess.DEVNULL)
+    with open(os.path.join(folder, 'NPS Timing Report.json'), encoding = 'utf-8') as file:
+        return json.load(file)
+
+#Time the NPS Dashboard.py Callbacks on the Summary Workbook and on the Summary Store the Pipeline Wrote, without and with the Sheet Cache
+#Raises when a Sheet Shows an Error, so the Suite never Times the Error Path
+def time_dashboard(dashboard, folder):
+    timings = {}
+    dashboard.excel_file_path = os.path.join(folder, 'NPS Quarterly Summary.xlsx')
+    for source, store_path in [('', None), (' store', os.path.join(folder, 'NPS Summary Store'))]:
+        dashboard.store_path = store_path
+        start = time.perf_counter()
+        sheets = [sheet for sheet in dashboard.load_data() if not sheet.endswith('Raw')]
+        timings['dashboard open_summary_store' if store_path else 'dashboard open_excel_file'] = time.perf_counter() - start
+        dashboard.sheet_cache.clear()
+        for cache in ['miss', 'hit']:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for sheet in sheets:
+                    heading = dashboard.update_output(sheet)[0].children[0].children
+                    if str(heading).startswith('Error'):
+                        raise RuntimeError(f"NPS Dashboard.py could not show {sheet}: {heading}")
+            timings[f"dashboard update_output{source} ({cache})"] = (time.perf_counter() - start) / len(sheets)
+    return {label: round(seconds, 6) for label, seconds in timings.items()}
+
+#Time every Stage End to End for each Size, Returning the Results to Store
+def run_suite(script_dir, pipeline, dashboard, sizes, options = []):
+    results = {'date': datetime.now().isoformat(timespec = 'seconds'), 'python': platform.python_version(),
+               'platform': platform.platform(), 'options': options, 'rows': {}}
+    for rows in sizes:
+        folder = os.path.join(script_dir, 'NPS Benchmark Data', f'{rows} rows {datetime.now().year}')
+        write_survey_workbooks(pipeline, folder, rows)
+        report = run_pipeline(script_dir, folder, options)
+        stages = {stage: total['seconds'] for stage, total in report['summary'].items()}
+        stages.update(time_dashboard(dashboard, folder))
+        stages['total'] = report['seconds']
+        peaks = {stage: total['peak_mb'] for stage, total in report['summary'].items() if total['peak_mb'] is not None}
+        results['rows'][str(rows)] = {'stages': stages, 'peak_mb': peaks}
+    return results
+
+#Print each Stage against the Baseline, Returning the Stages Slower by more than the Threshold
+def compare_results(results, baseline, threshold, min_seconds):
+    regressions = []
+    for rows, current in results['rows'].items():
+        previous = baseline['rows'].get(rows, {}).get('stages', {}) if baseline else {}
+        print(f"{rows + ' rows':<36}{'baseline (s)':>14}{'current (s)':>14}{'change':>10}")
+        for stage, seconds in current['stages'].items():
+            if stage not in previous:
+                print(f"{stage:<36}{'-':>14}{seconds:>14.4f}{'-':>10}")
+                continue
+            change = (seconds - previous[stage]) / previous[stage] if previous[stage] else 0.0
+            slower = change > threshold and seconds - previous[stage] > min_seconds
+            if slower:
+                regressions.append((rows, stage, previous[stage], seconds))
+            print(f"{stage:<36}{previous[stage]:>14.4f}{seconds:>14.4f}{change:>+9.0%}{' !' if slower else ''}")
+    return regressions
+
+#Start NPS.py in Server Mode on a Folder of Surveys, Returning the Process, its URL and Sheets once every Country is Loaded
+def start_server(script_dir, folder, threads = 8, options = [], timeout = 300):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    url = f'http://127.0.0.1:{port}/'
+    server = subprocess.Popen([sys.executable, os.path.join(script_dir, 'NPS.py'), '--no-webview', '--port', str(port),
+                               '--threads', str(threads), '--data-dir', folder, '--no-export', *options],
+                              stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and server.poll() is None:
+        try:
+            with urllib.request.urlopen(url + 'status', timeout = 1) as response:
+                status = json.load(response)
+            if status['done'] and not status['error']:
+                return server, url, status['sheets']
+            if status['error']:
+                break
+        except OSError:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"The dashboard server did not load the surveys in {folder}")
+
+#Request Body of the update_output Callback, as a Browser Sends it when a Sheet is Selected
+def callback_body(output, sheet_name):
+    return json.dumps({
+        'output': output,
+        'outputs': [{'id': 'output-data', 'property': 'children'}, {'id': 'output-weighted-scores', 'property': 'children'}],
+        'inputs': [{'id': 'input-sheet-name', 'property': 'value', 'value': sheet_name},
+                   {'id': 'cube-version', 'property': 'data', 'value': None}],
+        'changedPropIds': ['input-sheet-name.value'],
+        'state': [],
+    }).encode('utf-8')
+
+#Request Body of the Callback Shipping every Sheet's Graphs in Client-Side Mode, Sent once a Session Loads
+def payloads_body(output):
+    return json.dumps({
+        'output': output,
+        'outputs': {'id': 'sheet-payloads', 'property': 'data'},
+        'inputs': [{'id': 'cube-version', 'property': 'data', 'value': None}],
+        'changedPropIds': ['cube-version.data'],
+        'state': [],
+    }).encode('utf-8')
+
+#Concurrent Sessions each Selecting Random Sheets, Returning Throughput and Latency of the Server Callbacks
+#In Client-Side Mode a Session Fetches every Sheet's Graphs once and Switches Sheets without Server Requests
+def load_test(url, sheets, sessions = 50, requests = 20, seed = 0, client_side = False):
+    with urllib.request.urlopen(url + '_dash-dependencies') as response:
+        dependencies = json.load(response)
+    server_callbacks = [dependency for dependency in dependencies if not dependency.get('clientside_function')]
+    if client_side:
+        output = next(dependency['output'] for dependency in server_callbacks if dependency['output'] == 'sheet-payloads.data')
+        requests = 1
+    else:
+        output = next(dependency['output'] for dependency in server_callbacks
+                      if any(item['id'] == 'input-sheet-name' for item in dependency['inputs']))
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    def session(number):
+        rng = np.random.default_rng(seed + number)
+        bodies = [payloads_body(output)] if client_side else [callback_body(output, str(sheet_name)) for sheet_name in rng.choice(sheets, requests)]
+        for body in bodies:
+            request = urllib.request.Request(url + '_dash-update-component', data = body, headers = {'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout = 60) as response:
+                    response.read()
+            except OSError:
+                with lock:
+                    errors.append(number)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target = session, args = (number,)) for number in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies or [np.nan]) * 1000
+    return {
+        'sessions': sessions, 'requests': sessions * requests, 'errors': len(errors), 'seconds': round(elapsed, 3),
+        'throughput': round((sessions * requests - len(errors)) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1), 'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'max_ms': round(float(np.max(latencies)), 1),
+    }
+
+#Serve Synthetic Surveys with NPS.py and Load Test the Dashboard Callbacks
+def run_load_test_main(args, script_dir, pipeline):
+    folder = os.path.join(script_dir, 'NPS Benchmark Data', f'{args.load_rows} rows {datetime.now().year}')
+    write_survey_workbooks(pipeline, folder, args.load_rows)
+    print(f"Starting the dashboard server on {args.load_rows} responses per country...")
+    server, url, sheets = start_server(script_dir, folder, args.threads, ['--client-side'] if args.client_side else [])
+    try:
+        result = load_test(url, sheets, args.sessions, args.requests, client_side = args.client_side)
+        with urllib.request.urlopen(url + 'status') as response:
+            result['sheet_cache'] = json.load(response)['sheet_cache']
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{'sessions':>10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}")
+    print(f"{result['sessions']:>10}{result['requests']:>10}{result['errors']:>8}{result['throughput']:>10.1f}"
+          f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['max_ms']:>10.1f}")
+    print(f"Sheet cache: {result['sheet_cache']['hits']} hits, {result['sheet_cache']['misses']} misses")
+
+def run_suite_main(args, script_dir, pipeline):
+    dashboard = load_script(script_dir, 'NPS Dashboard.py', 'nps_dashboard')
+    results = run_suite(script_dir, pipeline, dashboard, args.rows, ['--trace-memory'] if args.trace_memory else [])
+
+    #Store the Results so Later Runs can be Compared with this One
+    results_dir = os.path.join(script_dir, 'NPS Benchmark Results')
+    os.makedirs(results_dir, exist_ok = True)
+    results_path = os.path.join(results_dir, results['date'].replace(':', '-') + '.json')
+    with open(results_path, 'w', encoding = 'utf-8') as file:
+        json.dump(results, file, indent = 2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding = 'utf-8') as file:
+            baseline = json.load(file)
+    regressions = compare_results(results, baseline, args.threshold, args.min_seconds)
+    print(f"Results saved to {results_path}")
+    if regressions:
+        for rows, stage, before, after in regressions:
+            print(f"Regression: {stage} at {rows} rows took {after:.4f} s against {before:.4f} s")
+        sys.exit(1)
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description = 'Benchmark the NPS pipeline and dashboard.')
+    parser.add_argument('sizes', nargs = '*', type = int, help = 'Row counts for the comparisons with the legacy functions')
+    parser.add_argument('--suite', action = 'store_true', help = 'Run the pipeline end to end on synthetic SG, MY and TH workbooks')
+    parser.add_argument('--rows', nargs = '+', type = int, default = [1000, 10000, 100000],
+                        help = 'Responses per country for the suite, from 1000 up to 1000000')
+    parser.add_argument('--baseline', help = 'Earlier suite results file to compare with')
+    parser.add_argument('--threshold', type = float, default = 0.25, help = 'Slowdown of a stage that fails the suite (0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type = float, default = 0.05, help = 'Slowdowns shorter than this are treated as noise')
+    parser.add_argument('--trace-memory', action = 'store_true', help = 'Also record the peak memory of each stage')
+    parser.add_argument('--load-test', action = 'store_true', help = 'Serve the dashboard with NPS.py and load test its callbacks')
+    parser.add_argument('--load-rows', type = int, default = 10000, help = 'Responses per country for the load test')
+    parser.add_argument('--sessions', type = int, default = 50, help = 'Concurrent sessions of the load test')
+    parser.add_argument('--requests', type = int, default = 20, help = 'Sheets each session selects in the load test')
+    parser.add_argument('--threads', type = int, default = 8, help = 'Request threads of the dashboard server in the load test')
+    parser.add_argument('--client-side', action = 'store_true',
+                        help = 'Load test the client-side mode, where sessions fetch every sheet once and switch sheets in the browser')
+    args = parser.parse_args()
+    pipeline = load_script(script_dir, 'NPS Excel.py', 'nps_excel')
+    if args.suite:
+        run_suite_main(args, script_dir, pipeline)
+        return
+    if args.load_test:
+        run_load_test_main(args, script_dir, pipeline)
+        return
+    sizes = args.sizes or [1000, 10000, 100000, 500000]
+    bench_cleanup(pipeline, sizes)
+    bench_update_name(pipeline, sizes)
+    bench_pivot(pipeline, [size * 10 for size in sizes])
+    bench_process(pipeline, sorted(set(sizes + [1000000])))
+    bench_cube(pipeline, sizes)
+    bench_export(pipeline, [size for size in sizes if size <= 100000])
+    bench_store(pipeline, [size for size in sizes if size <= 100000])
+    bench_memory(pipeline, sizes)
+    dashboard = load_script(script_dir, 'NPS Dashboard.py', 'nps_dashboard')
+    bench_weighted_scores(dashboard, [size for size in sizes if size <= 100000])
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
+import argparse
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
+import numpy as np
 import pandas as pd
-import webview
 import threading
+import socket
+import urllib.request
 import time
 import os
+import io
+import json
+from collections import OrderedDict, deque
+from functools import wraps
 
 # Initialize the Dash app
 app = dash.Dash(__name__)
@@ -17,189 +24,347 @@ def find_specific_excel_file(filename):
             return file
     return None
 
-# Specify the name of the Excel file to search for
-excel_filename = 'NPS Quarterly Summary.xlsx'
-
-# Find the specified Excel file in the current directory
-excel_file_path = find_specific_excel_file(excel_filename)
-
-# Check if the file was found
-if excel_file_path is None:
-    raise ValueError(f"Excel file '{excel_filename}' not found in the current directory.")
-
-# Load the Excel file
-excel_data = pd.ExcelFile(excel_file_path)
-sheet_names = excel_data.sheet_names
-
-# App layout
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='input-sheet-name',
-        options=[{'label': sheet, 'value': sheet} for sheet in sheet_names],
-        value=sheet_names[0],
-        clearable=False,  # Prevent clearing the dropdown
-        placeholder="Select a sheet"
-    ),
-    html.Div(id='output-data'),
-    html.Div(id='output-weighted-scores')
-])
+# Function to load the Excel file from memory, so the file itself is not kept open
+def open_excel_file(excel_file_path):
+    with open(excel_file_path, 'rb') as file:
+        return pd.ExcelFile(io.BytesIO(file.read()))
+
+# Function to load the summary store written by NPS Excel.py, memory-mapping the counts so no sheet has to be parsed
+def open_summary_store(store_path):
+    with open(store_path + '.json', encoding='utf-8') as file:
+        store = json.load(file)
+    store['counts'] = np.load(os.path.join(os.path.dirname(store_path), store['counts']), mmap_mode='r')
+    if list(store['counts'].shape) != store['shape']:
+        raise ValueError(f"Summary store '{store_path}' is incomplete.")
+    return store
+
+# Function to slice one sheet's pivot table out of the summary store, keeping only sales executives and ratings with responses
+def store_table(store, sheet_name):
+    country, years, months = store['sheets'][sheet_name]
+    counts = store['counts'][country][np.ix_(years, months)].sum(axis=(0, 1))
+    rows, columns = counts.any(axis=1), counts.any(axis=0)
+    index, column = store['names'][store['countries'][country]]
+    table = pd.DataFrame(counts[rows][:, columns],
+                         index=pd.Index(np.array(store['executives'], dtype=object)[rows], name=index),
+                         columns=pd.Index(np.array(store['ratings'])[columns], name=column))
+    return table.reset_index()
+
+# Function to load the summary store when there is one, otherwise the Excel file, returning the sheet names
+def load_data():
+    global summary_store, excel_data, data_mtime
+    if store_path is not None:
+        data_mtime = os.path.getmtime(store_path + '.json')
+        summary_store = open_summary_store(store_path)
+        return list(summary_store['sheets'])
+    data_mtime = os.path.getmtime(excel_file_path)
+    excel_data = open_excel_file(excel_file_path)
+    return excel_data.sheet_names
+
+# Weights for each rating: the default scores a rating by its value
+RATING_WEIGHTS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
+
+# NPS weighting on the 1-5 scale: promoters (5) count +1, passives (4) 0 and detractors (1-3) -1
+NPS_WEIGHTS = {1: -1, 2: -1, 3: -1, 4: 0, 5: 1}
+
+# Weighting schemes selectable with --weights
+WEIGHT_SCHEMES = {'value': RATING_WEIGHTS, 'nps': NPS_WEIGHTS}
+
+# Weights used for the weighted scores graph, set from --weights at startup
+score_weights = RATING_WEIGHTS
+
+# Function to read a column header such as 5, 5.0 or '5' as a rating, None for other headers
+def rating_label(col_name):
+    try:
+        return float(col_name)
+    except (TypeError, ValueError):
+        return None
 
 # Function to calculate weighted scores
-def calculate_weighted_scores(df):
-    # Example weights (adjust according to your data)
-    weights = {'1': 1, '2': 2, '3': 3, '4': 4, '5': 5}
-    
-    # Initialize an empty list to store weighted scores
-    weighted_scores = []
-
-    # Iterate through each row in the DataFrame
-    for index, row in df.iterrows():
-        # Calculate weighted score for the current row based on available numeric columns
-        weighted_score = 0
-        for col_name in df.columns[1:]:
-            if pd.api.types.is_numeric_dtype(df[col_name]):  # Check if column is numeric
-                weighted_score += row[col_name] * weights.get(str(col_name), 0)
-
-        # Append the weighted score to the list
-        weighted_scores.append(weighted_score)
-    
-    # Add the weighted scores list as a new column to the DataFrame
-    df['Weighted_Score'] = weighted_scores
+def calculate_weighted_scores(df, weights=None):
+    weights = {float(rating): weight for rating, weight in (weights or score_weights).items()}
+
+    # Find the numeric rating columns and their weights once
+    rating_columns = [col_name for col_name in df.columns[1:]
+                      if pd.api.types.is_numeric_dtype(df[col_name]) and rating_label(col_name) in weights]
+    weight_vector = np.array([weights[rating_label(col_name)] for col_name in rating_columns])
+
+    # Weighted score of every row as one matrix-vector product
+    if rating_columns:
+        df['Weighted_Score'] = df[rating_columns].to_numpy() @ weight_vector
+    else:
+        df['Weighted_Score'] = 0
     
     return df
 
+# Timings of recent callback calls, shown at /timings
+stage_log = deque(maxlen=10000)
+stage_lock = threading.Lock()
+
+# Decorator to record how long every call of a callback takes
+def instrument(stage):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            with stage_lock:
+                stage_log.append({'stage': stage, 'seconds': round(time.perf_counter() - start, 6), 'pid': os.getpid()})
+            return result
+        return wrapper
+    return decorate
+
+# Bounded LRU cache of the graphs built for each sheet
+sheet_cache = OrderedDict()
+sheet_cache_size = 32
+sheet_cache_stats = {'hits': 0, 'misses': 0}
+sheet_cache_lock = threading.Lock()
+
+# Function to reload the summary store or Excel file and empty the sheet cache when the file has been modified
+# Keeps the loaded data while the file is being replaced
+def refresh_data():
+    try:
+        mtime = os.path.getmtime(store_path + '.json' if store_path is not None else excel_file_path)
+    except OSError:
+        return
+    if mtime != data_mtime:
+        load_data()
+        sheet_cache.clear()
+
+# Function to build the graphs for one sheet
+def build_output(sheet_name):
+    # Slice the specified sheet out of the summary store, or load it from the Excel file, into a DataFrame
+    df = store_table(summary_store, sheet_name) if store_path is not None else excel_data.parse(sheet_name)
+
+    # Check if the DataFrame is empty
+    if df.empty:
+        return html.Div([
+            html.H4(f"No Data to Display for {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'})
+        ]), html.Div()
+
+    # Select only numeric columns and calculate total
+    numeric_df = df.select_dtypes(include=['number'])
+    df['Total'] = numeric_df.sum(axis=1)
+
+    # Annotations for Total Reviews
+    annotations1 = [
+        {
+            'x': x,
+            'y': y + 0.05 * max(df['Total']),  # Adjust y to place annotations above bars
+            'text': str(y),
+            'xref': 'x',
+            'yref': 'y',
+            'showarrow': False,
+            'font': {'size': 10},
+            'align': 'center'
+        }
+        for x, y in zip(df[df.columns[0]], df['Total'])
+    ]
+
+    # Calculate weighted scores
+    df_weighted_scores = calculate_weighted_scores(df)
+
+    # Annotations for Weighted Scores
+    annotations2 = [
+        {
+            'x': x,
+            'y': y + 0.05 * max(df_weighted_scores['Weighted_Score']),  # Adjust y for annotations
+            'text': str(y),
+            'xref': 'x',
+            'yref': 'y',
+            'showarrow': False,
+            'font': {'size': 10},
+            'align': 'center'
+        }
+        for x, y in zip(df[df.columns[0]], df_weighted_scores['Weighted_Score'])
+    ]
+
+    # Create figure for total reviews bar chart
+    fig_total_reviews = {
+        'data': [
+            {'x': df[df.columns[0]], 'y': df['Total'], 'type': 'bar', 'name': 'Total Reviews'},
+        ],
+        'layout': {
+            'title': {
+                'text': f"Total Reviews for {sheet_name}",
+                'font': {'size': 24}
+            },
+            'xaxis': {
+                'title': 'Sales Executives',  # X-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 1  # X-axis tick interval
+            },
+            'yaxis': {
+                'title': 'Total Reviews',  # Y-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 10  # Y-axis tick interval
+            },
+            'annotations': annotations1  # Annotations for total reviews
+        }
+    }
+
+    # Create figure for weighted scores bar chart
+    fig_weighted_scores = {
+        'data': [
+            {'x': df[df.columns[0]], 'y': df_weighted_scores['Weighted_Score'], 'type': 'bar', 'name': 'Weighted Scores'},
+        ],
+        'layout': {
+            'title': {
+                'text': f"Weighted Scores for {sheet_name}",
+                'font': {'size': 24}
+            },
+            'xaxis': {
+                'title': 'Sales Executives',  # X-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 1  # X-axis tick interval
+            },
+            'yaxis': {
+                'title': 'Weighted Scores',  # Y-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 50  # Y-axis tick interval
+            },
+            'annotations': annotations2  # Annotations for weighted scores
+        }
+    }
+
+    return (
+        html.Div([
+            html.H4(f"Data from {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'}),
+            dcc.Graph(id='total-reviews', figure=fig_total_reviews)
+        ]),
+        dcc.Graph(id='weighted-scores', figure=fig_weighted_scores)
+    )
+
 # Callback to update the data based on the input sheet name
 @app.callback(
     [Output('output-data', 'children'),
      Output('output-weighted-scores', 'children')],
     [Input('input-sheet-name', 'value')]
 )
+@instrument('update_output')
 def update_output(sheet_name):
+    start = time.perf_counter()
     try:
-        # Load the specified sheet into a DataFrame
-        df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
-        
-        # Check if the DataFrame is empty
-        if df.empty:
-            return html.Div([
-                html.H4(f"No Data to Display for {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'})
-            ]), html.Div()
-        
-        # Select only numeric columns and calculate total
-        numeric_df = df.select_dtypes(include=['number'])
-        df['Total'] = numeric_df.sum(axis=1)
-
-        # Annotations for Total Reviews
-        annotations1 = [
-            {
-                'x': x,
-                'y': y + 0.05 * max(df['Total']),  # Adjust y to place annotations above bars
-                'text': str(y),
-                'xref': 'x',
-                'yref': 'y',
-                'showarrow': False,
-                'font': {'size': 10},
-                'align': 'center'
-            }
-            for x, y in zip(df[df.columns[0]], df['Total'])
-        ]
-
-        # Calculate weighted scores
-        df_weighted_scores = calculate_weighted_scores(df)
-
-        # Annotations for Weighted Scores
-        annotations2 = [
-            {
-                'x': x,
-                'y': y + 0.05 * max(df_weighted_scores['Weighted_Score']),  # Adjust y for annotations
-                'text': str(y),
-                'xref': 'x',
-                'yref': 'y',
-                'showarrow': False,
-                'font': {'size': 10},
-                'align': 'center'
-            }
-            for x, y in zip(df[df.columns[0]], df_weighted_scores['Weighted_Score'])
-        ]
-
-        # Create figure for total reviews bar chart
-        fig_total_reviews = {
-            'data': [
-                {'x': df[df.columns[0]], 'y': df['Total'], 'type': 'bar', 'name': 'Total Reviews'},
-            ],
-            'layout': {
-                'title': {
-                    'text': f"Total Reviews for {sheet_name}",
-                    'font': {'size': 24}
-                },
-                'xaxis': {
-                    'title': 'Sales Executives',  # X-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 1  # X-axis tick interval
-                },
-                'yaxis': {
-                    'title': 'Total Reviews',  # Y-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 10  # Y-axis tick interval
-                },
-                'annotations': annotations1  # Annotations for total reviews
-            }
-        }
-
-        # Create figure for weighted scores bar chart
-        fig_weighted_scores = {
-            'data': [
-                {'x': df[df.columns[0]], 'y': df_weighted_scores['Weighted_Score'], 'type': 'bar', 'name': 'Weighted Scores'},
-            ],
-            'layout': {
-                'title': {
-                    'text': f"Weighted Scores for {sheet_name}",
-                    'font': {'size': 24}
-                },
-                'xaxis': {
-                    'title': 'Sales Executives',  # X-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 1  # X-axis tick interval
-                },
-                'yaxis': {
-                    'title': 'Weighted Scores',  # Y-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 50  # Y-axis tick interval
-                },
-                'annotations': annotations2  # Annotations for weighted scores
-            }
-        }
+        with sheet_cache_lock:
+            refresh_data()
+            if sheet_name in sheet_cache:
+                # Serve the sheet from the cache and mark it as recently used
+                sheet_cache.move_to_end(sheet_name)
+                sheet_cache_stats['hits'] += 1
+            else:
+                # Build the sheet and drop the least recently used one when full
+                sheet_cache[sheet_name] = build_output(sheet_name)
+                sheet_cache_stats['misses'] += 1
+                if len(sheet_cache) > sheet_cache_size:
+                    sheet_cache.popitem(last=False)
+            output = sheet_cache[sheet_name]
 
-        return (
-            html.Div([
-                html.H4(f"Data from {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'}),
-                dcc.Graph(id='total-reviews', figure=fig_total_reviews)
-            ]),
-            dcc.Graph(id='weighted-scores', figure=fig_weighted_scores)
-        )
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{sheet_name} shown in {elapsed:.1f} ms (sheet cache: {sheet_cache_stats['hits']} hits, {sheet_cache_stats['misses']} misses)")
+        return output
     except Exception as e:
         return html.Div([
             html.H4(f"Error: {str(e)}", style={'textAlign': 'center', 'fontSize': '24px'})
         ]), html.Div()
 
+# Function to pick the port for the Dash server: the preferred one when free, otherwise any free port
+def find_free_port(preferred_port=8050):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', preferred_port))
+        except OSError:
+            sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+# Health endpoint polled before the window opens
+@app.server.route('/health')
+def health():
+    return 'ok'
+
+# Callback timings of this session as JSON, totals first
+@app.server.route('/timings')
+def timings():
+    with stage_lock:
+        records = list(stage_log)
+    summary = {}
+    for record in records:
+        total = summary.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0})
+        total['calls'] += 1
+        total['seconds'] = round(total['seconds'] + record['seconds'], 6)
+    report = {'summary': summary, 'stages': records}
+    return app.server.response_class(json.dumps(report, indent=2), mimetype='application/json')
+
 # Function to start Dash server
-def run_dash():
-    app.run_server(debug=True, port=8050, use_reloader=False)
+def run_dash(port):
+    app.run(debug=True, port=port, use_reloader=False)
 
-# Function to create webview window after a delay
-def create_webview_with_delay(delay_seconds):
-    time.sleep(delay_seconds)  # Delay for specified seconds
-    webview.create_window("Dash App", "http://127.0.0.1:8050/", width=1200, height=1600, resizable=True)
+# Function to wait until the Dash server answers its health endpoint, False after the timeout
+def wait_for_server(url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url + 'health', timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+# Function to create webview window as soon as the server accepts connections
+def create_webview_when_ready(url, start_time, timeout=30):
+    if wait_for_server(url, timeout):
+        print(f"Dashboard ready at {url} in {time.perf_counter() - start_time:.2f} s")
+    else:
+        print(f"Dashboard not ready after {timeout} s, opening {url} anyway")
+    import webview  # Loaded here so startup does not wait for the GUI backend
+    webview.create_window("Dash App", url, width=1200, height=1600, resizable=True)
     webview.start()
 
 # Entry point of the script
 if __name__ == '__main__':
-    dash_thread = threading.Thread(target=run_dash)
+    start_time = time.perf_counter()
+
+    # Weighting of the weighted scores graph
+    parser = argparse.ArgumentParser(description='NPS dashboard of the summary store or workbook.')
+    parser.add_argument('--weights', choices=list(WEIGHT_SCHEMES), default='value',
+                        help='Score each rating by its value, or with NPS weighting (promoters +1, passives 0, detractors -1)')
+    score_weights = WEIGHT_SCHEMES[parser.parse_args().weights]
+
+    # Specify the names of the summary store and the Excel file to search for
+    store_name = 'NPS Summary Store'
+    excel_filename = 'NPS Quarterly Summary.xlsx'
+
+    # Find them in the current directory, preferring the summary store as it needs no parsing
+    store_path = store_name if find_specific_excel_file(store_name + '.json') else None
+    excel_file_path = find_specific_excel_file(excel_filename)
+
+    # Check if either was found
+    if store_path is None and excel_file_path is None:
+        raise ValueError(f"Neither summary store '{store_name}' nor Excel file '{excel_filename}' found in the current directory.")
+
+    # Load the summary store or the Excel file
+    sheet_names = load_data()
+
+    # App layout
+    app.layout = html.Div([
+        dcc.Dropdown(
+            id='input-sheet-name',
+            options=[{'label': sheet, 'value': sheet} for sheet in sheet_names],
+            value=sheet_names[0],
+            clearable=False,  # Prevent clearing the dropdown
+            placeholder="Select a sheet"
+        ),
+        html.Div(id='output-data'),
+        html.Div(id='output-weighted-scores')
+    ])
+
+    # Start the server on 8050, or on a free port when 8050 is busy
+    port = find_free_port()
+    dash_thread = threading.Thread(target=run_dash, args=(port,))
     dash_thread.start()
 
-    # Delay webview creation to ensure server is up
-    create_webview_with_delay(delay_seconds=0)  # Adjust delay as needed
+    # Open the window once the server is up
+    create_webview_when_ready(f"http://127.0.0.1:{port}/", start_time)
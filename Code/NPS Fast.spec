@@ -0,0 +1,55 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Fast-start build of NPS.py: pyinstaller "NPS Fast.spec"
+# One folder (dist/NPS) instead of one file, so a launch does not first extract the whole archive to a temp dir,
+# and no UPX, so libraries load without being decompressed. Put the survey files next to dist/NPS/NPS.exe.
+
+
+a = Analysis(
+    ['NPS.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[
+        # Test suites and build tools shipped inside numpy and pandas
+        'numpy.tests', 'numpy.f2py', 'numpy.distutils', 'pandas.tests', 'pandas.conftest',
+        # Optional pandas readers, writers and plotting the app never uses
+        'matplotlib', 'scipy', 'tables', 'sqlalchemy', 'xlrd', 'xlsxwriter', 'odf', 'pyxlsb', 'lxml', 'bs4', 'html5lib',
+        # Interactive and test tools pulled in by optional imports
+        'IPython', 'tkinter', 'pytest', 'dash.testing', 'selenium',
+    ],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='NPS',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='NPS',
+)
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+#Imports a Script without Running its Entry Point, so only the Module-Level Import Cost is Measured
+IMPORT_SCRIPT = ("import importlib.util, sys; spec = importlib.util.spec_from_file_location('startup', sys.argv[1]); "
+                 "spec.loader.exec_module(importlib.util.module_from_spec(spec))")
+
+#Parse -X importtime Lines into (Module, Self us, Cumulative us, Depth)
+def parse_importtime(log):
+    imports = []
+    for line in log.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)', line)
+        if match:
+            imports.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return imports
+
+#Import the Script in a Fresh Interpreter with -X importtime, Returning the Wall Time and the Parsed Log
+def profile_import(script_path):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT, script_path],
+                            capture_output = True, text = True, cwd = os.path.dirname(script_path))
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"Importing {os.path.basename(script_path)} failed: {errors[-1] if errors else result.returncode}")
+    return wall, parse_importtime(result.stderr)
+
+#Total Import Time and the Slowest Top-Level Imports
+def summarize(imports, top = 15):
+    top_level = [(module, cumulative) for module, _, cumulative, depth in imports if depth == 0]
+    top_level.sort(key = lambda item: item[1], reverse = True)
+    return {
+        'import_ms': round(sum(cumulative for _, cumulative in top_level) / 1000, 1),
+        'modules': len(imports),
+        'slowest': {module: round(cumulative / 1000, 1) for module, cumulative in top_level[:top]},
+    }
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description = 'Report the cold-start import cost of the NPS dashboard.')
+    parser.add_argument('--script', default = 'NPS.py', help = 'Script to profile, relative to this folder')
+    parser.add_argument('--log', help = 'Summarize an existing -X importtime log instead, e.g. one captured from a build')
+    parser.add_argument('--release', default = '', help = 'Release label recorded in the history file')
+    parser.add_argument('--runs', type = int, default = 3, help = 'Fresh interpreters to start; the first is the cold start')
+    parser.add_argument('--history', default = 'NPS Startup Report.jsonl', help = 'File the report is appended to')
+    args = parser.parse_args()
+
+    report = {'date': datetime.now().isoformat(timespec = 'seconds'), 'release': args.release,
+              'python': platform.python_version(), 'platform': platform.platform()}
+    if args.log:
+        with open(args.log, encoding = 'utf-8') as file:
+            report.update(source = os.path.basename(args.log), **summarize(parse_importtime(file.read())))
+    else:
+        runs = [profile_import(os.path.join(script_dir, args.script)) for _ in range(args.runs)]
+        report.update(source = args.script, cold_ms = round(runs[0][0] * 1000, 1),
+                      warm_ms = round(min(wall for wall, _ in runs[1:] or runs) * 1000, 1), **summarize(runs[-1][1]))
+
+    #Print the Report and Keep it for Comparison with Earlier Releases
+    print(f"Startup report for {report['source']} ({report['python']}, {report['date']})")
+    if 'cold_ms' in report:
+        print(f"{'interpreter + imports':<32}{'cold':>10}{report['cold_ms']:>10.1f} ms{'warm':>10}{report['warm_ms']:>10.1f} ms")
+    print(f"{'imports (' + str(report['modules']) + ' modules)':<32}{report['import_ms']:>30.1f} ms")
+    for module, elapsed in report['slowest'].items():
+        print(f"  {module:<30}{elapsed:>30.1f} ms")
+    with open(os.path.join(script_dir, args.history), 'a', encoding = 'utf-8') as file:
+        file.write(json.dumps(report) + '\n')
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,1061 @@
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+import argparse
+import difflib
+import hashlib
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import numpy as np
 import pandas as pd
-import webview
 import threading
+import socket
+import urllib.request
 import time
+import tracemalloc
 import os
+import pickle
+import re
+import shutil
 import sys
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from screeninfo import get_monitors
+from functools import lru_cache, partial, wraps
 
-#Reads Files from Same Directory
-def read_files(script_dir):
+#Stage Records of Recent Runs: Wall Time, Rows In and Out, and Peak Traced Memory while tracemalloc is On
+#Each Record Carries the Run of the Thread that Recorded it, so Concurrent Runs and Callbacks are Told Apart
+stage_log = deque(maxlen = 10000)
+stage_lock = threading.Lock()
+stage_context = threading.local()
+run_numbers = itertools.count(1)
 
-    #Construct paths to Excel files
-    df_sg_path = os.path.join(script_dir, 'C2B Customer Satisfaction Survey (Responses).xlsx')
-    df_my_path = os.path.join(script_dir, 'MY C2B Customer Satisfaction Survey (Responses).xlsx')
-    df_th_path = os.path.join(script_dir, 'TH C2B Customer Satisfaction Survey (Responses).xlsx')
+#Start a New Run on this Thread, or Join the Given One (e.g. on a Background Export Thread), Returning its ID
+def start_run(run = None):
+    stage_context.run = run or f"{os.getpid()}.{next(run_numbers)}"
+    return stage_context.run
 
-    #Read Excel files into DataFrames
+#Stage Records of a Run, or of every Run
+def run_stages(run = None):
+    with stage_lock:
+        return [record for record in stage_log if run is None or record.get('run') == run]
+
+#Rows in a DataFrame or a List of DataFrames, None for Anything Else
+def count_rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, pd.DataFrame) for item in value):
+        return sum(len(item) for item in value)
+    return None
+
+#Add Stage Records, such as those Returned by a Worker Process
+def record_stages(records):
+    with stage_lock:
+        stage_log.extend(records)
+
+#Record a Stage every Time the Decorated Function Runs
+#The Traced Peak is Reset for each Stage, so the Peak of an Enclosing Stage so far is Carried on a per-Thread Stack
+#and a Nested Stage's Peak is Folded into it
+def instrument(stage):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                peaks = stage_context.__dict__.setdefault('peaks', [])
+                if peaks:
+                    peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+                peaks.append(0)
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                if tracing:
+                    peaks.pop()
+                raise
+            seconds = time.perf_counter() - start
+
+            #Rows of every DataFrame Argument, and of the Result (or the Argument Updated in Place)
+            rows_in = [rows for rows in map(count_rows, args) if rows is not None]
+            rows_out = count_rows(result) if result is not None else count_rows(args[0]) if args else None
+            record = {'stage': stage, 'seconds': round(seconds, 6), 'rows_in': sum(rows_in) if rows_in else None,
+                      'rows_out': rows_out, 'pid': os.getpid(), 'run': getattr(stage_context, 'run', None)}
+            if tracing:
+                peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                record['peak_mb'] = round(peak / 2 ** 20, 3)
+            record_stages([record])
+            return result
+        return wrapper
+    return decorate
+
+#Totals per Stage, in the Order Stages First Ran
+def summarize_stages(records):
+    summary = {}
+    for record in records:
+        total = summary.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'peak_mb': None})
+        total['calls'] += 1
+        total['seconds'] = round(total['seconds'] + record['seconds'], 6)
+        for key in ['rows_in', 'rows_out']:
+            if record[key] is not None:
+                total[key] = (total[key] or 0) + record[key]
+        if record.get('peak_mb') is not None:
+            total['peak_mb'] = max(total['peak_mb'] or 0, record['peak_mb'])
+    return summary
+
+#Write the Stage Records of a Run as JSON, with Totals per Stage
+#With the Countries and Latency of a Watch Mode Refresh when Given
+def write_timing_report(script_dir, started, file_name = 'NPS Timing Report.json', run = None, refresh = None):
+    records = run_stages(run)
+    report = {
+        'date': datetime.now().isoformat(timespec = 'seconds'),
+        'argv': sys.argv[1:],
+        'seconds': round(time.perf_counter() - started, 6),
+        'summary': summarize_stages(records),
+        'stages': records,
+    }
+    if refresh:
+        report['refresh'] = refresh
+    path = os.path.join(script_dir, file_name)
+    with open(path, 'w', encoding = 'utf-8') as file:
+        json.dump(report, file, indent = 2)
+    print(f"Timing report saved to {path}")
+
+#Start cProfile or pyinstrument for the Run, Falling Back to cProfile when pyinstrument is not Installed
+def start_profiler(kind):
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed, profiling with cProfile instead.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+#Stop the Profiler, Save its Output next to the Timing Report and Print the Slowest Calls
+def save_profile(profiler, script_dir):
+    if hasattr(profiler, 'output_html'):
+        profiler.stop()
+        path = os.path.join(script_dir, 'NPS Profile.html')
+        with open(path, 'w', encoding = 'utf-8') as file:
+            file.write(profiler.output_html())
+        print(profiler.output_text())
+    else:
+        import pstats
+        profiler.disable()
+        path = os.path.join(script_dir, 'NPS Profile.prof')
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+    print(f"Profile saved to {path}")
+
+#Folder for Parsed Survey Workbooks, next to the Survey Files
+def cache_path(script_dir):
+    return os.path.join(script_dir, 'NPS Cache')
+
+#Remove every Cached Workbook
+def clear_cache(cache_dir):
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+        print(f"Cache cleared: {cache_dir}")
+
+#Write a Cache File Aside then Swap it in, so an Interrupted Run never Leaves a Truncated Entry
+#The Temporary Name Includes the Process, as Workers and Dashboards can Write at the Same Time
+def save_atomic(path, write, mode = 'wb'):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, mode, encoding = None if 'b' in mode else 'utf-8') as file:
+        write(file)
+    os.replace(temp_path, path)
+
+#Identify a Workbook by Path, Modified Time, Size and Optionally its Contents
+def file_key(path, use_hash = False):
+    stat = os.stat(path)
+    key = {'path': os.path.abspath(path), 'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'hash': None}
+    if use_hash:
+        with open(path, 'rb') as file:
+            key['hash'] = hashlib.sha256(file.read()).hexdigest()
+    return key
+
+#Read a Workbook, Reusing the Parsed DataFrame while the File is Unchanged
+#Columns Kept from a Sheet: usecols is a List of Headers, or a Function of the Header Row Returning One
+def keep_columns(df, usecols):
+    if usecols is None:
+        return df
+    return df[usecols(list(df.columns)) if callable(usecols) else usecols]
+
+#Cache Entry of a Workbook, without its .json or .pkl Extension
+def cache_entry(path, cache_dir):
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest())
+
+#The Cache Keeps every Column, only the usecols Columns are Returned when Given
+#The Version Read (Modified Time and Size) is Returned in the Stats, None when the File Changed while it was Parsed
+def read_excel_cached(path, cache_dir, stats, use_hash = False, usecols = None):
+    key = file_key(path, use_hash)
+    entry = cache_entry(path, cache_dir)
+
+    #Cache Hit when Modified Time and Size Match, or the Contents Hash Matches
     try:
-        print(f"Reading Excel files...")
-        df_sg = pd.read_excel(df_sg_path)
-        df_my = pd.read_excel(df_my_path)
-        df_th = pd.read_excel(df_th_path)
-        print(f"Excel files read successfully.")
-    except FileNotFoundError as e:
-        print(f"Error: Excel file not found at path: {e.filename}")
-        sys.exit(1)
+        with open(entry + '.json', encoding = 'utf-8') as file:
+            cached_key = json.load(file)
+        same_stat = (cached_key['mtime'], cached_key['size']) == (key['mtime'], key['size'])
+        same_hash = use_hash and cached_key['hash'] == key['hash']
+        if same_stat or same_hash:
+            df = pd.read_pickle(entry + '.pkl')
+            stats['hits'] += 1
+            stats['version'] = (key['mtime'], key['size'])
+            if not same_stat:
+                save_atomic(entry + '.json', partial(json.dump, key), 'w')
+            return keep_columns(df, usecols)
+    #A Missing, Truncated or Incompatible Entry (e.g. Pickled by an Older pandas) is Parsed Again
+    except Exception:
+        pass
 
-    df = [df_sg, df_my, df_th]
-    return df
+    #Cache Miss: Parse the Workbook and Store it for the Next Run, unless it was being Saved Meanwhile
+    df = pd.read_excel(path)
+    stats['misses'] += 1
+    stats['version'] = (key['mtime'], key['size']) if file_stat(path) == (key['mtime'], key['size']) else None
+    if stats['version']:
+        os.makedirs(cache_dir, exist_ok = True)
+        save_atomic(entry + '.pkl', df.to_pickle)
+        save_atomic(entry + '.json', partial(json.dump, key), 'w')
+    return keep_columns(df, usecols)
+
+#Survey Schema of each Country, in Report Order: its Survey File, Sales Team and the Form Header of each Field
+#A New Country Needs only an Entry here, Headers are Matched Loosely by match_headers()
+SCHEMAS = {
+    'SG': {
+        'file': 'C2B Customer Satisfaction Survey (Responses).xlsx',
+        'sales': ['Jasmine', 'Zhengjun', 'Jun', 'Jezelle', 'Joanna', 'Berlyn', 
+                  'Elaine', 'Leng Kiat', 'Roger', 'Katherine', 'Sharon', 'Darryl',
+                  'Norfazlin', 'Emir', 'Peggy', 'Diana', "A'rif Alimi", 'Mann', 'Mashrurah', 
+                  'Adeyrah', 'Mel', 'Mark', 'Nurul Nadia', 'Lishan'],
+        'headers': {
+            'timestamp': 'Timestamp',
+            'enquiry_id': 'Your Enquiry ID (this section has been pre-filled for you)',
+            'executive': 'Your Motorist Client Sales Executive (this section has been pre-filled for you)',
+            'rating': 'How was your experience with your Motorist Customer Representative?',
+        },
+    },
+    'MY': {
+        'file': 'MY C2B Customer Satisfaction Survey (Responses).xlsx',
+        'sales': ['Sook Ling', 'Hisham', 'Jia', 'Nadzirah', 'Alaina', 'Adeline', 'Mel'],
+        'headers': {
+            'timestamp': 'Timestamp',
+            'enquiry_id': 'Your Enquiry ID (this section has been pre-filled for you)\nID Pertanyaan Anda (bahagian ini telah di pra-isi untuk anda)',
+            'executive': 'Your Motorist Sales Executive (this section has been pre-filled for you)\nEksekutif Jualan Pemandu anda (bahagian ini telah dipraisi untuk anda)',
+            'rating': 'How was your experience with your Motorist Customer Representative?\nBagaimanakah pengalaman anda dengan pegawai khidmat pelanggan Motorist?',
+        },
+    },
+    'TH': {
+        'file': 'TH C2B Customer Satisfaction Survey (Responses).xlsx',
+        'sales': ['Pitchapak (Guitar)', 'Nareenart (Toei)', 'Monsicha (Yok)', 
+                  'Duangcheewan (Kratai)', 'Punchita (Belle)',
+                  'Pattaratiyaporn (Gap)', 'Pasu (Au)', 
+                  'Nisarat (Earn)', 'Sittichok (Job)', 'Konkanok (Teen)'],
+        'headers': {
+            'timestamp': 'Timestamp',
+            'enquiry_id': 'หมายเลขผู้ใช้บริการของคุณ (ข้อมูลส่วนนี้ระบบกรอกอัตโนมัติให้คุณ)',
+            'executive': 'เจ้าหน้าที่มอเตอริสต์ผู้ให้บริการ(ข้อมูลส่วนนี้ระบบกรอกอัตโนมัติให้คุณ)',
+            'rating': 'ระดับความพึงพอใจของท่านในการบริการของเจ้าหน้าที่มอเตอริสต์',
+        },
+    },
+}
+
+#Country Codes, in Report Order
+COUNTRIES = list(SCHEMAS)
+
+#Construct paths to Excel files
+def survey_paths(script_dir):
+    return [os.path.join(script_dir, schema['file']) for schema in SCHEMAS.values()]
+
+#Header Compared without Case, Line Breaks or Repeated Spaces
+def normalize_header(header):
+    return ' '.join(str(header).split()).casefold()
+
+#Form Header of each Field in a Header Row: the Same Header once Normalized, else the Same First Line
+#(e.g. a Bilingual Header with a Reworded Translation), else the Closest Header; Resolved once per Header Row
+@lru_cache(maxsize = None)
+def match_headers(row, fields):
+    normalized = {normalize_header(header): header for header in row}
+    first_lines = {normalize_header(str(header).split('\n')[0]): header for header in row}
+    headers = {}
+    for field, header in fields:
+        first_line = normalize_header(header.split('\n')[0])
+        if normalize_header(header) in normalized:
+            headers[field] = normalized[normalize_header(header)]
+        elif first_line in first_lines:
+            headers[field] = first_lines[first_line]
+        else:
+            closest = difflib.get_close_matches(normalize_header(header), list(normalized), n = 1, cutoff = 0.8)
+            if not closest:
+                raise ValueError(f"no column matches the {field} header {header!r}")
+            headers[field] = normalized[closest[0]]
+    return headers
+
+#Form Headers of a Schema's Fields in a Header Row, the Columns the Pipeline Reads
+def schema_columns(schema, row):
+    return list(dict.fromkeys(match_headers(tuple(row), tuple(schema['headers'].items())).values()))
+
+#Read one Workbook, through the Cache when a Cache Folder is Given
+#Only the usecols Columns when Given, e.g. the Columns the Pipeline Reads, and the Version Read in the Stats
+#Without a Cache the Workbook is Parsed once and Narrowed, as openpyxl Parses every Cell even for a Narrow Read
+@instrument('read_survey')
+def read_survey(path, cache_dir, stats, use_hash = False, usecols = None):
+    if cache_dir:
+        return read_excel_cached(path, cache_dir, stats, use_hash, usecols)
+    version = file_stat(path)
+    df = pd.read_excel(path)
+    stats['version'] = version if file_stat(path) == version else None
+    return keep_columns(df, usecols)
 
-#Convert Months to Quarters
-def month_to_quarter(month):
-    if month in ['January', 'February', 'March']:
-        return 1
-    elif month in ['April', 'May', 'June']:
-        return 2
-    elif month in ['July', 'August', 'September']:
-        return 3
-    elif month in ['October', 'November', 'December']:
-        return 4
-
-#Data Processing
-def process(data):
-    #Filter to Desired Year
-    year = datetime.now().year
-    data = data[data['Timestamp'].dt.year == year]
+#Full Rows of the Survey Version that was Ingested: its Cache Entry, or without a Cache the File while Unchanged
+#Raises RuntimeError once that Version is Gone, so Rows are never Matched to Cleaned Responses of Another Version
+@instrument('read_survey')
+def read_version(path, cache_dir, version):
+    if version is not None and cache_dir:
+        entry = cache_entry(path, cache_dir)
+        try:
+            with open(entry + '.json', encoding = 'utf-8') as file:
+                key = json.load(file)
+            df = pd.read_pickle(entry + '.pkl')
+            #The Key is Read again, in case the Entry was Replaced while the Rows were Loaded
+            with open(entry + '.json', encoding = 'utf-8') as file:
+                same_entry = json.load(file) == key
+            if same_entry and (key['mtime'], key['size']) == tuple(version):
+                return df
+        except Exception:
+            pass
+    elif version is not None and file_stat(path) == tuple(version):
+        df = pd.read_excel(path)
+        if file_stat(path) == tuple(version):
+            return df
+    raise RuntimeError(f"{os.path.basename(path)} changed since it was read")
+
+#Month Names in Calendar Order, Kept as an Ordered Categorical
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+#Data Processing, Keeping the Given Years (Default: the Current Year)
+@instrument('process')
+def process(data, years = None):
+    #Filter to Desired Years
+    years = years or [datetime.now().year]
+    data = data[data['Timestamp'].dt.year.isin(years)]
+    timestamps = data['Timestamp']
 
     #Group by Month
-    data['Month'] = pd.to_datetime(data['Timestamp'], format='%d/%m/%y', errors='coerce').dt.strftime('%B')
+    month = timestamps.dt.month.fillna(0).astype('int64') - 1
+    data['Month'] = pd.Categorical.from_codes(month, categories = MONTHS, ordered = True)
     
     #Group by Quarter
-    data['Quarter'] = data['Month'].apply(month_to_quarter)
+    data['Quarter'] = timestamps.dt.quarter
 
     return data
 
 #Data Cleaning/Processing
+@instrument('cleanup')
 def cleanup(df, column, separators = ['and', '&']):
-    new_rows = []
-
-    #Look for any Rows with Multiple Names
-    for index, row in df.iterrows():
-        names = [row[column]]
-        for separator in separators:
-            temp_names = []
-            for name in names:
-                temp_names.extend(name.split(f' {separator} '))
-            names = [name.strip() for name in temp_names]
-
-        #Split row into multiple entries for every name present
-        if len(names) > 1:
-            for name in names:
-                new_row = row.copy()
-                new_row[column] = name
-                new_rows.append(new_row)
-        else:
-            new_rows.append(row)
+    #Split Names on Every Separator, One Column-Wise Pass per Separator
+    names = df[column].reset_index(drop = True)
+    for separator in separators:
+        names = names.str.split(f' {separator} ').explode().str.strip()
+
+    #Repeat Rows with Multiple Names once for every Name present
+    positions = names.index.to_numpy()
+    multiple = names.groupby(level = 0).transform('size').to_numpy() > 1
+    df = df.iloc[positions]
+    names = names.where(multiple, df[column].to_numpy())
 
     #Update the original DataFrame with the new rows
-    df = pd.DataFrame(new_rows)
+    df = df.assign(**{column: names.to_numpy()})
     return df
 
+#Regex of the Names Folded into a Trie, so Names Share their Prefixes: at each Position the Engine Follows
+#the one Branch of the Next Character, and the Cost per Entry does not Grow with the Roster
+def trie_pattern(names):
+    trie = {}
+    for name in names:
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def branches(node):
+        alternatives = [re.escape(char) + branches(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        group = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        #A Name Ending here is Optional to Extend, the Longest Name is Matched
+        return f'(?:{group})?' if '' in node else group
+
+    return branches(trie)
+
+#Name Matcher Built Once per Sales Team
+#Returns the Regex and, for each Lowercased Name, the Best Rank of the Names it Starts with, as the Trie Matches
+#the Longest Name at a Position and every Shorter Name there is a Prefix of it
+@lru_cache(maxsize = None)
+def name_matcher(name_list):
+    #Rank of each Lowercased Name, Earlier Entries Win
+    ranks = {}
+    for rank, match in enumerate(name_list):
+        ranks.setdefault(match.lower(), rank)
+    best = {match: min(ranks.get(match[:end], rank) for end in range(len(match) + 1)) for match, rank in ranks.items()}
+
+    #Lookahead finds the Longest Name starting at Every Position
+    return re.compile(f'(?=({trie_pattern(ranks)}))'), best
+
 #Updating Name Column to be Uniform
+@instrument('update_name')
 def update_name(df, name_list, column):
-    for index, row in df.iterrows():
-        changed = False
-        name = row[column]
-        #Loop through Names to Find a Match
-        for match in name_list:
-            if match.lower() in name.lower():
-                df.loc[index, column] = match
-                changed = True
-                break        
+    name_list = tuple(name_list)
+    matcher, ranks = name_matcher(name_list)
+
+    #Match each Distinct Entry Once, Keeping the First Name in the List that Appears
+    codes, entries = pd.factorize(df[column])
+    matches = []
+    for name in entries:
+        found = matcher.findall(name.lower()) if name_list else []
         #Update Entries with No Matches
-        if changed == False:
-            match = 'No Name'
-            df.loc[index, column] = match
+        matches.append(name_list[min(ranks[match] for match in found)] if found else 'No Name')
+
+    #Write all Rows Back in One Pass, Blank Cells (Code -1) Taking the 'No Name' Appended Last
+    df[column] = np.array(matches + ['No Name'], dtype = object)[codes]
+
+#Memory-Lean Columns: the Given Columns as Categoricals, Whole Numbers in the Smallest Integer Type
+#Text Columns that are all Whole Numbers (e.g. Enquiry IDs) are Converted First, Dates and Categoricals are Kept
+@instrument('optimize_dtypes')
+def optimize_dtypes(df, categorical = []):
+    columns = {}
+    for name, values in df.items():
+        if name in categorical:
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                columns[name] = values.astype('category')
+            continue
+        if values.dtype == object:
+            numbers = pd.to_numeric(values, errors = 'coerce')
+            if numbers.notna().all() and pd.api.types.is_integer_dtype(numbers):
+                values = numbers
+        if pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            columns[name] = pd.to_numeric(values, downcast = 'integer')
+    return df.assign(**columns)
 
 #Data Filtering
-def filter(data_info):
+def filter(data_info, years = None):
     df = []
     for data, column, sales_list in data_info:
         #Data Processing/Cleaning
         pd.options.mode.chained_assignment = None  #Disable Warnings
-        data = process(data)
+        data = process(data, years)
         data[column] = data[column].astype(str)
         pd.options.mode.chained_assignment = 'warn' #Enable Warnings
         data = cleanup(data, column)   
         update_name(data, sales_list, column) 
-        df.append(data)
+        df.append(optimize_dtypes(data, [column]))
     return df
 
-#Creates Pivot Tables by Quarters
-def create_pivot_table(df, value, index, column):
-    quarters = [1, 2, 3, 4]
-    pivot_tables = []
-
-    for quarter in quarters:
-        df_q = df[df['Quarter'] == quarter]
-        pivot_table = pd.pivot_table(df_q, 
-                                     values = value,
-                                     index = index,
-                                     columns = column,
-                                     aggfunc='count',
-                                     fill_value=0 )
-        pivot_table = pivot_table.reset_index()
-        pivot_tables.append(pivot_table)
-    return pivot_tables
+#Fingerprint of a Column or of whole Rows of a Sheet, with their Row Labels as the Raw Sheets Look Rows up by Label
+def fingerprint(values):
+    return hashlib.sha1(pd.util.hash_pandas_object(values, index = True).to_numpy().tobytes()).hexdigest()
+
+#Clean only Responses Added since the Last Run and Merge their Counts, for the Current Year's Rows
+def update_incremental(data, path, column, sales_list, pivot, state_dir):
+    value, index, rating = pivot
+    state_file = os.path.join(state_dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + '.state.pkl')
+    signature = (datetime.now().year, column, tuple(sales_list), tuple(pivot), tuple(COUNT_LEVELS))
+    try:
+        with open(state_file, 'rb') as file:
+            state = pickle.load(file)
+    except Exception:
+        state = None
+
+    #Start Over when the Year, Sales Team or Columns Changed, or Earlier Responses were Edited or Re-Sorted,
+    #Fingerprinting Every Column Read so a Corrected Executive or Rating is Cleaned Again
+    if (not isinstance(state, dict) or state.get('signature') != signature or len(data) < state['seen']
+            or fingerprint(data.iloc[:state['seen']]) != state['fingerprint']):
+        state = {'signature': signature, 'seen': 0, 'data': None, 'counts': None}
+
+    #New Form Responses are Appended below the Rows Seen so Far
+    new = data.iloc[state['seen']:]
+
+    #Clean and Count the New Responses, then Merge them into the Saved Totals
+    cleaned = filter([(new, column, sales_list)])[0]
+    counts = count_responses(cleaned, value, index, rating)
+    if state['data'] is not None:
+        if len(cleaned):
+            cleaned = optimize_dtypes(pd.concat([state['data'], cleaned]), [column])
+            counts = state['counts'].add(counts, fill_value = 0).astype('int64').sort_index()
+        else:
+            cleaned, counts = state['data'], state['counts']
+    print(f"{len(new)} new responses cleaned from {os.path.basename(path)} (latest: {data['Timestamp'].max()}).")
+
+    #Save the Watermark for the Next Run
+    state.update(seen = len(data), fingerprint = fingerprint(data), data = cleaned, counts = counts)
+    os.makedirs(state_dir, exist_ok = True)
+    save_atomic(state_file, partial(pickle.dump, state, protocol = pickle.HIGHEST_PROTOCOL))
+    return cleaned, counts
+
+#Clean and Count a Finished Year Once, Reusing it while that Year's Responses are Unchanged
+def frozen_year(data, path, year, column, sales_list, pivot, partition_dir):
+    partition_file = os.path.join(partition_dir, f"{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()}.{year}.frozen.pkl")
+    signature = (year, column, tuple(sales_list), tuple(pivot), tuple(COUNT_LEVELS))
+    rows = fingerprint(data)
+    try:
+        with open(partition_file, 'rb') as file:
+            partition = pickle.load(file)
+        if partition['signature'] == signature and partition['fingerprint'] == rows:
+            return partition['data'], partition['counts']
+    except Exception:
+        pass
+
+    #First Run for this Year, or its Responses were Edited
+    cleaned = filter([(data, column, sales_list)], [year])[0]
+    counts = count_responses(cleaned, *pivot)
+    print(f"{len(data)} responses from {year} cleaned and frozen for {os.path.basename(path)}.")
+    os.makedirs(partition_dir, exist_ok = True)
+    save_atomic(partition_file, partial(pickle.dump, {'signature': signature, 'fingerprint': rows, 'data': cleaned, 'counts': counts},
+                                        protocol = pickle.HIGHEST_PROTOCOL))
+    return cleaned, counts
+
+#Read, Clean and Count a Single Country by Year, Runs inside a Worker Process when Parallel
+#Finished Years are Frozen in the Cache Folder, the Current Year is Cleaned Incrementally when a State Folder is Given
+#The Form Headers Found for the Schema's Fields are Returned in the Stats
+def ingest_country(path, schema, cache_dir = None, use_hash = False, state_dir = None, years = None):
+    stats = {'hits': 0, 'misses': 0}
+    data = read_survey(path, cache_dir, stats, use_hash, partial(schema_columns, schema))
+    headers = match_headers(tuple(data.columns), tuple(schema['headers'].items()))
+    data = data.rename(columns = {headers['timestamp']: 'Timestamp'})
+    column, sales_list = headers['executive'], schema['sales']
+    pivot = (headers['enquiry_id'], headers['executive'], headers['rating'])
+    current_year = datetime.now().year
+    response_years = data['Timestamp'].dt.year
+
+    partitions = []
+    for year in years or [current_year]:
+        rows = data[response_years == year]
+        if year < current_year and cache_dir:
+            partitions.append(frozen_year(rows, path, year, column, sales_list, pivot, cache_dir))
+        elif year == current_year and state_dir:
+            partitions.append(update_incremental(rows, path, column, sales_list, pivot, state_dir))
+        else:
+            cleaned = filter([(rows, column, sales_list)], [year])[0]
+            partitions.append((cleaned, count_responses(cleaned, *pivot)))
+
+    if len(partitions) == 1:
+        cleaned, counts = partitions[0]
+    else:
+        cleaned = optimize_dtypes(pd.concat([cleaned for cleaned, _ in partitions]), [column])
+        counts = pd.concat([counts for _, counts in partitions])
+
+    stats['headers'] = headers
+    return cleaned, counts, stats
+
+#Ingest a Country in a Worker Process as Part of the Parent's Run, Handing its Stages Back in the Stats
+#A Worker Runs one Task at a Time, so its Log Holds only the Current Task's Stages once Cleared
+def ingest_worker(run, *task):
+    start_run(run)
+    stage_log.clear()
+    cleaned, counts, stats = ingest_country(*task)
+    stats['stages'] = run_stages(run)
+    return cleaned, counts, stats
+
+#Run every Country in its own Worker Process, None if no Process Pool can Start
+#ready(position, counts) is Called for each Country as soon as it Finishes
+def ingest_parallel(tasks, workers, ready = None):
+    try:
+        print(f"Reading Excel files in parallel...")
+        with ProcessPoolExecutor(max_workers = workers or len(tasks)) as executor:
+            run = getattr(stage_context, 'run', None)
+            futures = {executor.submit(ingest_worker, run, *task): position for position, task in enumerate(tasks)}
+            results = [None] * len(tasks)
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                record_stages(results[futures[future]][2]['stages'])
+                if ready:
+                    ready(futures[future], results[futures[future]][1])
+            return results
+    except FileNotFoundError:
+        raise
+    except (BrokenProcessPool, OSError, NotImplementedError) as e:
+        print(f"Parallel reading unavailable ({e}), reading files one at a time.")
+        return None
+
+#Read, Clean and Count every Country, Cleaning only New Responses when Incremental
+#Returns the Cleaned Responses, Counts, Form Headers and the Survey Version Read of each Country
+#Only the Given Countries when Given, e.g. those whose Survey Changed in Watch Mode
+@instrument('ingest')
+def ingest(script_dir, workers = 1, use_cache = True, use_hash = False, incremental = False, years = None, ready = None, countries = None):
+    cache_dir = cache_path(script_dir) if use_cache else None
+    state_dir = cache_path(script_dir) if incremental else None
+    tasks = [(path, schema, cache_dir, use_hash, state_dir, years)
+             for path, (country, schema) in zip(survey_paths(script_dir), SCHEMAS.items())
+             if countries is None or country in countries]
+
+    try:
+        results = ingest_parallel(tasks, workers, ready) if workers != 1 else None
+        if results is None:
+            print(f"Reading Excel files...")
+            results = []
+            for position, task in enumerate(tasks):
+                results.append(ingest_country(*task))
+                if ready:
+                    ready(position, results[-1][1])
+    except FileNotFoundError as e:
+        print(f"Error: Excel file not found at path: {e.filename}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    hits = sum(stats['hits'] for _, _, stats in results)
+    misses = sum(stats['misses'] for _, _, stats in results)
+    print(f"Excel files read successfully (cache: {hits} hits, {misses} misses).")
+    df = [cleaned for cleaned, _, _ in results]
+    counts = [count for _, count, _ in results]
+    headers = [stats['headers'] for _, _, stats in results]
+    versions = [stats['version'] for _, _, stats in results]
+    return df, counts, headers, versions
+
+#Raw Sheet of a Country: the Full Survey Rows behind the Cleaned Responses, with the Cleaned Sales Executive, Month and Quarter
+#Read Again when Exporting, so Unused Columns are not Held while Cleaning, from the Version that was Cleaned
+def raw_sheet(path, cleaned, column, cache_dir = None, version = None):
+    data = read_version(path, cache_dir, version)
+    return data.loc[cleaned.index].assign(**{name: cleaned[name].array for name in [column, 'Month', 'Quarter']})
+
+#Cleaned Responses in the Report Quarters, Keeping their Row Labels for the Raw Sheets
+def report_rows(cleaned, quarters):
+    timestamps = cleaned['Timestamp']
+    return cleaned[(timestamps.dt.year * 4 + timestamps.dt.quarter).isin([year * 4 + quarter for year, quarter in quarters])]
+
+#Time Levels the Responses are Counted by, ahead of Sales Executive and Rating
+COUNT_LEVELS = ['Year', 'Month']
+
+#Counts for every Year, Month, Sales Executive and Rating in a Single Pass
+def count_responses(df, value, index, column):
+    timestamps = df['Timestamp']
+    return df.groupby([timestamps.dt.year.rename('Year'), timestamps.dt.month.rename('Month'), index, column],
+                      observed = True)[value].count()
+
+#Ratings that Count as Promoters and Detractors on the 1-5 Scale
+PROMOTER_RATINGS = [5]
+DETRACTOR_RATINGS = [1, 2, 3]
+
+#Metrics Cube: Response Counts as one Array of Country x Year x Month x Sales Executive x Rating
+#Also Records the Report Quarters, Every Quarter of the Years Counted by Default
+@instrument('build_cube')
+def build_cube(counts, quarters = None):
+    years = sorted(set(year for year, _ in quarters or []).union(
+        *(count.index.get_level_values('Year') for count in counts.values())))
+    executives = sorted(set().union(*(count.index.get_level_values(2) for count in counts.values())))
+    ratings = sorted(set().union(*(count.index.get_level_values(3) for count in counts.values())))
+    cube = np.zeros((len(counts), len(years), len(MONTHS), len(executives), len(ratings)), dtype = np.int64)
+
+    #Scatter each Country's Counts into its Slice of the Array
+    for position, count in enumerate(counts.values()):
+        levels = count.index
+        cells = (pd.Index(years).get_indexer(levels.get_level_values(0)),
+                 levels.get_level_values(1).to_numpy() - 1,
+                 pd.Index(executives).get_indexer(levels.get_level_values(2)),
+                 pd.Index(ratings).get_indexer(levels.get_level_values(3)))
+        np.add.at(cube[position], cells, count.to_numpy())
+
+    return {
+        'countries': list(counts), 'years': years, 'months': MONTHS,
+        'executives': np.array(executives, dtype = object), 'ratings': np.array(ratings),
+        'names': {country: tuple(count.index.names[2:]) for country, count in counts.items()},
+        'counts': cube,
+        'quarters': quarters or [(year, quarter) for year in years for quarter in [1, 2, 3, 4]],
+    }
+
+#Months Covered by a Quarter, Numbered from 1
+def quarter_months(quarter):
+    return list(range(3 * quarter - 2, 3 * quarter + 1))
+
+#Report Quarters as (Year, Quarter): Every Quarter of the Given Years, or the Trailing Quarters up to Today
+def report_quarters(years = None, trailing_quarters = None, today = None):
+    today = today or datetime.now()
+    if trailing_quarters:
+        current = today.year * 4 + (today.month - 1) // 3
+        return [(position // 4, position % 4 + 1) for position in range(current - trailing_quarters + 1, current + 1)]
+    return [(year, quarter) for year in years or [today.year] for quarter in [1, 2, 3, 4]]
+
+#Sheet Label of each Report Quarter, with the Year once the Report Spans Several Years
+def quarter_labels(quarters):
+    if len(set(year for year, _ in quarters)) == 1:
+        return [f"Q{quarter}" for _, quarter in quarters]
+    return [f"{year} Q{quarter}" for year, quarter in quarters]
+
+#Sales Executive x Rating Counts Summed over the Selected Countries, Years, Months and Sales Executives
+def cube_counts(cube, country = None, year = None, months = None, executives = None):
+    counts = cube['counts']
+    if country is not None:
+        counts = counts[cube['countries'].index(country)][None]
+    if year is not None:
+        counts = counts[:, [position for position, cube_year in enumerate(cube['years']) if cube_year == year]]
+    if months is not None:
+        counts = counts[:, :, np.array(months, dtype = int) - 1]
+    counts = counts.sum(axis = (0, 1, 2))
+    if executives is not None:
+        counts = counts * np.isin(cube['executives'], executives)[:, None]
+    return counts
+
+#Pivot Table of a Selection, Keeping only Sales Executives and Ratings with Responses
+def cube_table(cube, country = None, year = None, months = None, executives = None):
+    counts = cube_counts(cube, country, year, months, executives)
+    rows, columns = counts.any(axis = 1), counts.any(axis = 0)
+    index, column = cube['names'][country] if country in cube['names'] else ('Sales Executive', 'Rating')
+    table = pd.DataFrame(counts[rows][:, columns], index = pd.Index(cube['executives'][rows], name = index),
+                         columns = pd.Index(cube['ratings'][columns], name = column))
+    return table.reset_index()
+
+#Totals, Promoter Share, NPS and Weighted Score of a Selection
+def cube_metrics(cube, country = None, year = None, months = None, executives = None, weights = None):
+    by_rating = cube_counts(cube, country, year, months, executives).sum(axis = 0)
+    ratings = cube['ratings']
+    total = int(by_rating.sum())
+    promoters = int(by_rating[np.isin(ratings, PROMOTER_RATINGS)].sum())
+    detractors = int(by_rating[np.isin(ratings, DETRACTOR_RATINGS)].sum())
+    weights = weights or {rating: rating for rating in ratings}
+    return {
+        'total': total,
+        'promoter_share': 100 * promoters / total if total else 0.0,
+        'nps': 100 * (promoters - detractors) / total if total else 0.0,
+        'weighted_score': (by_rating @ np.array([weights.get(rating, 0) for rating in ratings])).item(),
+    }
+
+#Creates Pivot Tables by Quarters (Default: the Current Year's), from the Metrics Cube when Given
+@instrument('create_pivot_table')
+def create_pivot_table(df, value, index, column, cube = None, country = None, quarters = None):
+    quarters = quarters or report_quarters()
+    if cube is None:
+        cube = build_cube({country: count_responses(df, value, index, column)}, quarters)
+    return [cube_table(cube, country, year, quarter_months(quarter)) for year, quarter in quarters]
+
+#Header Styles Matching pandas.DataFrame.to_excel, Built on First Export so openpyxl Loads only when Needed
+@lru_cache(maxsize = None)
+def header_styles():
+    from openpyxl.styles import Alignment, Border, Font, Side
+    border = Border(left = Side(style = 'thin'), right = Side(style = 'thin'),
+                    top = Side(style = 'thin'), bottom = Side(style = 'thin'))
+    return Font(bold = True), border, Alignment(horizontal = 'center', vertical = 'top')
+
+#Date Style Matching pandas.DataFrame.to_excel
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+#Stream a DataFrame into a Write-Only Sheet, a Chunk of Rows at a Time
+def stream_sheet(workbook, df, sheet_name, chunk_size = 10000):
+    from openpyxl.cell import WriteOnlyCell
+    sheet = workbook.create_sheet(sheet_name)
+
+    #Header Row
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(sheet, name)
+        cell.font, cell.border, cell.alignment = header_styles()
+        header.append(cell)
+    sheet.append(header)
+
+    #Data Rows, Blank Cells for Missing Values
+    datetime_columns = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)]
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for row in chunk.itertuples(index = False, name = None):
+            row = list(row)
+            for i in datetime_columns:
+                if row[i] is not None:
+                    row[i] = WriteOnlyCell(sheet, row[i].to_pydatetime())
+                    row[i].number_format = DATETIME_FORMAT
+            sheet.append(row)
+
+#Write a Sheet with either a Streaming Workbook or a pandas ExcelWriter
+def write_sheet(writer, df, sheet_name):
+    if isinstance(writer, pd.ExcelWriter):
+        df.to_excel(writer, sheet_name = sheet_name, index = False)
+    else:
+        stream_sheet(writer, df, sheet_name)
 
 #Exports Pivot Tables into Individual Sheets
-def export_pivot(pivot_list, country, writer):
-    i = 0    
-    while i < 4:
-        sheet_name = f"{country} Q{i + 1}"
-        pivot_list[i].to_excel(writer, sheet_name = sheet_name, index = False)
-        i += 1
+def export_pivot(pivot_list, country, writer, labels = None):
+    labels = labels or quarter_labels(report_quarters())
+    for pivot_table, label in zip(pivot_list, labels):
+        sheet_name = f"{country} {label}"
+        write_sheet(writer, pivot_table, sheet_name)
+
+#Sheet Names for the Dashboard by Country: each Report Quarter, then the Year to Date or each Whole Year
+def cube_sheet_names(cube):
+    years = sorted(set(year for year, _ in cube['quarters']))
+    periods = quarter_labels(cube['quarters']) + (['YTD'] if len(years) == 1 else [str(year) for year in years])
+    return [f"{country} {period}" for country in cube['countries'] for period in periods]
+
+#Country, Year and Months of a Sheet Name such as 'SG Q1', 'SG YTD', 'SG March', 'SG 2025' or 'SG 2025 Q4'
+#The Year is None (every Year Counted) when the Name has None
+def sheet_selection(sheet_name):
+    country, *period = sheet_name.split(' ')
+    year = int(period.pop(0)) if period and period[0].isdigit() else None
+    period = ' '.join(period)
+    if period in ['', 'YTD']:
+        return country, year, None
+    if period in MONTHS:
+        return country, year, [MONTHS.index(period) + 1]
+    if period[:1] == 'Q' and period[1:] in ['1', '2', '3', '4']:
+        return country, year, quarter_months(int(period[1:]))
+    raise KeyError(sheet_name)
 
 #Create New Excel File with Multiple Sheets
-def create_excel(script_dir, sg_pivot, my_pivot, th_pivot, df_sg, df_my, df_th):
+#'write-only' streams rows to disk, 'openpyxl' builds the whole workbook in memory first
+#pivots and raw Map each Country to its Pivot Tables and Raw Sheet
+@instrument('create_excel')
+def create_excel(output_dir, pivots, raw, engine = 'write-only', labels = None):
     output_file = 'NPS Quarterly Summary.xlsx'
     print(f"Writing data to Excel file: {output_file}...")
-    output_path = os.path.join(script_dir, output_file)
+    output_path = os.path.join(output_dir, output_file)
 
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer: 
-        export_pivot(sg_pivot, "SG", writer)
-        export_pivot(my_pivot, "MY", writer)
-        export_pivot(th_pivot, "TH", writer)
-        df_sg.to_excel(writer, sheet_name = "SG Raw", index = False)
-        df_my.to_excel(writer, sheet_name = "MY Raw", index = False)
-        df_th.to_excel(writer, sheet_name = "TH Raw", index = False)
+    if engine == 'write-only':
+        from openpyxl import Workbook
+        writer = Workbook(write_only = True)
+    else:
+        writer = pd.ExcelWriter(output_path, engine = 'openpyxl')
 
-    print(f"Excel file '{output_file}' successfully created in {script_dir}")
+    for country, pivot_list in pivots.items():
+        export_pivot(pivot_list, country, writer, labels)
+    #Raw Sheets Given as Functions are Built one at a Time
+    for country, df in raw.items():
+        write_sheet(writer, df() if callable(df) else df, f"{country} Raw")
 
-def main():
-    
+    if engine == 'write-only':
+        writer.save(output_path)
+    else:
+        writer.close()
+
+    print(f"Excel file '{output_file}' successfully created in {output_dir}")
+
+#Parquet Needs Text Column Names and one Type per Column: Rating Headers become Text, Columns Mixing Text and Numbers become Text
+def parquet_frame(df):
+    df = df.rename(columns = str)
+    mixed = [name for name, values in df.items()
+             if values.dtype == object and pd.api.types.infer_dtype(values) in ['mixed', 'mixed-integer', 'mixed-integer-float']]
+    return df.astype({name: 'string' for name in mixed})
+
+#Write each Sheet as a CSV or Parquet File, in a Folder Named after the Excel File
+@instrument('export_files')
+def export_files(output_dir, pivots, raw, file_format = 'csv', labels = None):
+    folder = os.path.join(output_dir, 'NPS Quarterly Summary')
+    print(f"Writing data to {file_format} files in: {folder}...")
+    os.makedirs(folder, exist_ok = True)
+    labels = labels or quarter_labels(report_quarters())
+    sheets = [(f"{country} {label}", pivot_table) for country, pivot_list in pivots.items()
+              for pivot_table, label in zip(pivot_list, labels)]
+    sheets += [(f"{country} Raw", df) for country, df in raw.items()]
+
+    #Raw Sheets Given as Functions are Built one at a Time
+    for sheet_name, df in sheets:
+        df = df() if callable(df) else df
+        path = os.path.join(folder, f"{sheet_name}.{file_format}")
+        if file_format == 'csv':
+            #With a Byte Order Mark so Excel Reads the Thai and Malay Headers as UTF-8
+            df.to_csv(path, index = False, encoding = 'utf-8-sig')
+        else:
+            parquet_frame(df).to_parquet(path, index = False)
+
+    print(f"{len(sheets)} {file_format} files successfully created in {folder}")
+
+#Write the Pivot Tables and Raw Sheets as an Excel File, or as CSV or Parquet Files
+def write_outputs(output_dir, pivots, raw, file_format = 'xlsx', engine = 'write-only', labels = None):
+    if file_format == 'xlsx':
+        create_excel(output_dir, pivots, raw, engine, labels)
+    else:
+        export_files(output_dir, pivots, raw, file_format, labels)
+
+#Signature of the Survey Schemas and Count Levels, so a Store Built by an Earlier Release (e.g. with Another Sales Team) is not Reused
+def schema_signature():
+    return hashlib.sha1(json.dumps([SCHEMAS, COUNT_LEVELS, MONTHS], sort_keys = True).encode('utf-8')).hexdigest()
+
+#Compact Summary Store for the Dashboards: the Metrics Cube's Counts as a .npy File that is Memory-Mapped rather than Read,
+#and as JSON its Labels, the Selection of every Sheet, the Schemas and the Survey Versions it was Built from
+#Each Save Writes its Counts under a New Name, then Swaps in the JSON Pointing to them, so a Reader Sees a Complete Store
+#and a Dashboard Mapping the Old Counts (which Windows does not Let be Replaced) does not Stop the Save
+@instrument('write_store')
+def write_store(output_dir, cube, surveys = {}):
+    path = os.path.join(output_dir, 'NPS Summary Store')
+    sheets = {}
+    for sheet_name in cube_sheet_names(cube):
+        country, year, months = sheet_selection(sheet_name)
+        sheets[sheet_name] = [cube['countries'].index(country),
+                              [position for position, cube_year in enumerate(cube['years']) if year in [None, cube_year]],
+                              [month - 1 for month in months or range(1, len(MONTHS) + 1)]]
+    counts_file = f"NPS Summary Store.{time.time_ns()}.npy"
+    store = {
+        'countries': cube['countries'], 'years': [int(year) for year in cube['years']], 'months': cube['months'],
+        'executives': cube['executives'].tolist(), 'ratings': cube['ratings'].tolist(),
+        'names': {country: list(names) for country, names in cube['names'].items()},
+        'quarters': [[int(year), int(quarter)] for year, quarter in cube['quarters']],
+        'counts': counts_file, 'shape': list(cube['counts'].shape), 'sheets': sheets,
+        'schema': schema_signature(),
+        'surveys': {country: list(version or []) for country, version in surveys.items()},
+    }
+    try:
+        with open(path + '.json', encoding = 'utf-8') as file:
+            previous = json.load(file).get('counts')
+    except Exception:
+        previous = None
+    try:
+        with open(os.path.join(output_dir, counts_file), 'wb') as file:
+            np.save(file, np.ascontiguousarray(cube['counts']))
+        save_atomic(path + '.json', partial(json.dump, store), 'w')
+    except OSError as e:
+        print(f"Summary store not saved ({e})")
+        remove_store(output_dir)
+        return
+
+    #Remove Counts no Longer Pointed to, Keeping the Previous ones for Readers that Loaded the Old JSON just before the Swap
+    #Counts still Mapped by a Dashboard on Windows cannot be Removed yet, and are Removed by a Later Save
+    for name in os.listdir(output_dir):
+        if name.startswith('NPS Summary Store.') and name.endswith('.npy') and name not in [counts_file, previous]:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                pass
+    print(f"Summary store saved to {path}.json and {counts_file}")
+
+#Remove the Summary Store when a Run does not Save it, so the Dashboards do not Prefer it over the Newer Outputs
+#The JSON Goes First, so a Reader never Sees it Pointing to Removed Counts
+def remove_store(output_dir):
+    names = ['NPS Summary Store.json'] + [name for name in os.listdir(output_dir)
+                                          if name.startswith('NPS Summary Store.') and name.endswith('.npy')]
+    for name in names:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except OSError:
+            pass
+
+#Metrics Cube of the Summary Store, with the Counts Memory-Mapped, and the Store's JSON
+#None when there is no Complete Store
+def read_store(output_dir):
+    path = os.path.join(output_dir, 'NPS Summary Store')
+    try:
+        with open(path + '.json', encoding = 'utf-8') as file:
+            store = json.load(file)
+        counts = np.load(os.path.join(output_dir, store['counts']), mmap_mode = 'r')
+    except (OSError, ValueError, KeyError):
+        return None
+    if list(counts.shape) != store['shape']:
+        return None
+    cube = {
+        'countries': store['countries'], 'years': store['years'], 'months': store['months'],
+        'executives': np.array(store['executives'], dtype = object), 'ratings': np.array(store['ratings']),
+        'names': {country: tuple(names) for country, names in store['names'].items()},
+        'counts': counts,
+        'quarters': [tuple(quarter) for quarter in store['quarters']],
+    }
+    return cube, store
+
+#Years such as '2025', '2023-2025' or '2023,2025'
+def parse_years(text):
+    years = set()
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        try:
+            years.update(range(int(first), int(last or first) + 1))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid years: {text!r}")
+    return sorted(years)
+
+#Write the Outputs and then the Timing Report of the Run, on the Background Export Thread when there is One
+#One Export at a Time, as Refreshes in Watch Mode can Overlap
+export_lock = threading.Lock()
+#A Failed Export after a Watch Mode Refresh is Reported and Left to the Next Refresh, so Watching Continues
+def export_with_report(export_args, started, run = None, refresh = None):
+    start_run(run)
+    with export_lock:
+        try:
+            #Only the Timing Report when only the Summary Store was Selected
+            if export_args[1] or export_args[2]:
+                write_outputs(*export_args)
+            write_timing_report(export_args[0], started, run = run, refresh = refresh)
+        except Exception as e:
+            if refresh is None:
+                raise
+            print(f"Export after the refresh of {', '.join(refresh['countries'])} failed ({e}), still watching.")
+
+#Modified Time and Size of a File, None while it is Missing (e.g. Mid-Save)
+def file_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+#Watch the Survey Files, Calling on_change(positions, changed_at) once a Burst of Saves has Settled
+#A Changed File is Settled when it Exists and has not Changed for settle Seconds; changed_at is when the First Change was Seen
+def watch_surveys(paths, on_change, poll = 1.0, settle = 2.0, stop = None):
+    seen = [file_stat(path) for path in paths]
+    pending = {}
+    while True:
+        if stop is None:
+            time.sleep(poll)
+        elif stop.wait(poll):
+            return
+        now = time.perf_counter()
+        for position, path in enumerate(paths):
+            stat = file_stat(path)
+            if stat != seen[position]:
+                seen[position] = stat
+                pending[position] = (pending.get(position, (now, now))[0], now)
+
+        #Rebuild every Settled File Together
+        settled = [position for position, (_, last) in pending.items() if now - last >= settle and seen[position] is not None]
+        if settled:
+            changed_at = min(pending.pop(position)[0] for position in settled)
+            try:
+                on_change(sorted(settled), changed_at)
+            except Exception as e:
+                print(f"Rebuild after the change failed ({e}), still watching.")
+
+#Command Line Options, Strict when Run on its Own, Lenient when the Dashboard Mixes in its Server Options
+def parse_args(argv = None, strict = False):
+    parser = argparse.ArgumentParser(description = 'Build the NPS Quarterly Summary workbook.')
+    parser.add_argument('--data-dir', help = 'Folder with the survey files, also used for the cache and, without --output-dir, the outputs (default: next to this script)')
+    parser.add_argument('--output-dir', help = 'Folder for the outputs and timing report (default: the survey folder)')
+    parser.add_argument('--countries', nargs = '+', choices = COUNTRIES, help = 'Only read and report these countries (default: all)')
+    parser.add_argument('--quarters', nargs = '+', type = int, choices = [1, 2, 3, 4], help = 'Only report these quarters of each year, e.g. 1 2')
+    parser.add_argument('--outputs', nargs = '+', choices = ['pivots', 'raw', 'store'], default = ['pivots', 'raw', 'store'],
+                        help = 'Outputs to write: the quarterly pivot tables and the cleaned raw responses in the workbook or files, '
+                               'and the compact summary store the dashboards load')
+    parser.add_argument('--format', choices = ['xlsx', 'csv', 'parquet'], default = 'xlsx',
+                        help = 'One Excel workbook, or one CSV or Parquet file per sheet')
+    parser.add_argument('--no-export', action = 'store_true',
+                        help = 'Only build the metrics cube, writing no outputs or timing report (e.g. in dashboard server workers)')
+    parser.add_argument('--no-cache', action = 'store_true', help = 'Always parse the survey workbooks, and start the dashboard without the summary store')
+    parser.add_argument('--clear-cache', action = 'store_true', help = 'Delete the parsed workbook cache before reading')
+    parser.add_argument('--hash', action = 'store_true', help = 'Also match cached workbooks by content hash')
+    parser.add_argument('--incremental', action = 'store_true', help = 'Only clean responses added since the last run')
+    parser.add_argument('--excel-engine', choices = ['write-only', 'openpyxl'], default = 'write-only',
+                        help = 'Stream rows to the workbook, or build it in memory with pandas')
+    parser.add_argument('--workers', type = int, default = 1, help = 'Worker processes for reading and cleaning (0 = one per country, 1 = serial)')
+    history = parser.add_mutually_exclusive_group()
+    history.add_argument('--years', type = parse_years, help = "Report every quarter of these years, e.g. 2025 or 2023-2025 (default: current year)")
+    history.add_argument('--trailing-quarters', type = int, metavar = 'N', help = 'Report the last N quarters up to today')
+    parser.add_argument('--profile', choices = ['cprofile', 'pyinstrument'], help = 'Profile the run and save the profile next to the timing report')
+    parser.add_argument('--trace-memory', action = 'store_true', help = 'Record the peak traced memory of each stage (slower)')
+    parser.add_argument('--watch', action = 'store_true', help = 'Keep running and rebuild a country whenever its survey file changes')
+    parser.add_argument('--settle', type = float, default = 2.0,
+                        help = 'Seconds a changed survey must stay unchanged before it is rebuilt in watch mode')
+    if strict:
+        return parser.parse_args(argv)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+#Survey Folder (also for the Cache) and Output Folder of the Run
+def data_dirs(args):
     #Determine script directory
     if getattr(sys, 'frozen', False):
         #When running as a bundled executable (e.g., PyInstaller)
@@ -164,259 +1064,632 @@ def main():
         #When running as a script
         script_dir = os.path.dirname(os.path.abspath(__file__))
 
-    #Reads Files into Dataframes List
-    df = read_files(script_dir)
-    
-    #List of Sales Team
-    sg_sales = ['Jasmine', 'Zhengjun', 'Jun', 'Jezelle', 'Joanna', 'Berlyn', 
-                'Elaine', 'Leng Kiat', 'Roger', 'Katherine', 'Sharon', 'Darryl',
-                'Norfazlin', 'Emir', 'Peggy', 'Diana', "A'rif Alimi", 'Mann', 'Mashrurah', 
-                'Adeyrah', 'Mel', 'Mark', 'Nurul Nadia', 'Lishan']
-    my_sales = ['Sook Ling', 'Hisham', 'Jia', 'Nadzirah', 'Alaina', 'Adeline', 'Mel']       
-    th_sales = ['Pitchapak (Guitar)', 'Nareenart (Toei)', 'Monsicha (Yok)', 
-                'Duangcheewan (Kratai)', 'Punchita (Belle)',
-                'Pattaratiyaporn (Gap)', 'Pasu (Au)', 
-                'Nisarat (Earn)', 'Sittichok (Job)', 'Konkanok (Teen)']   
-    
-    #Data Info
-    data_info = [
-        (df[0], 'Your Motorist Client Sales Executive (this section has been pre-filled for you)', sg_sales),
-        (df[1], 'Your Motorist Sales Executive (this section has been pre-filled for you)\nEksekutif Jualan Pemandu anda (bahagian ini telah dipraisi untuk anda)', my_sales),
-        (df[2], 'เจ้าหน้าที่มอเตอริสต์ผู้ให้บริการ(ข้อมูลส่วนนี้ระบบกรอกอัตโนมัติให้คุณ)', th_sales)
-    ]
+    #Survey Files, Cache and Outputs in Another Folder when Given
+    if args.data_dir:
+        script_dir = os.path.abspath(args.data_dir)
 
-    #Data Filtering
-    df = filter(data_info)
-    
-    #SG Pivot Tables
-    sg_pivot = create_pivot_table(df[0],
-                                'Your Enquiry ID (this section has been pre-filled for you)',
-                                'Your Motorist Client Sales Executive (this section has been pre-filled for you)',
-                                'How was your experience with your Motorist Customer Representative?' )
-    #MY Pivot Tables
-    my_pivot = create_pivot_table(df[1],
-                                'Your Enquiry ID (this section has been pre-filled for you)\nID Pertanyaan Anda (bahagian ini telah di pra-isi untuk anda)',
-                                'Your Motorist Sales Executive (this section has been pre-filled for you)\nEksekutif Jualan Pemandu anda (bahagian ini telah dipraisi untuk anda)',
-                                'How was your experience with your Motorist Customer Representative?\nBagaimanakah pengalaman anda dengan pegawai khidmat pelanggan Motorist?' )
-    #TH Pivot Tables
-    th_pivot = create_pivot_table(df[2],
-                                'หมายเลขผู้ใช้บริการของคุณ (ข้อมูลส่วนนี้ระบบกรอกอัตโนมัติให้คุณ)',
-                                'เจ้าหน้าที่มอเตอริสต์ผู้ให้บริการ(ข้อมูลส่วนนี้ระบบกรอกอัตโนมัติให้คุณ)',
-                                'ระดับความพึงพอใจของท่านในการบริการของเจ้าหน้าที่มอเตอริสต์' )
-    
-    #Output New Excel File
-    create_excel(script_dir, sg_pivot, my_pivot, th_pivot, df[0], df[1], df[2])
+    #Outputs and Timing Report in their own Folder when Given
+    output_dir = os.path.abspath(args.output_dir) if args.output_dir else script_dir
+    return script_dir, output_dir
 
-# Initialize the Dash app and Create Excel File
-app = dash.Dash(__name__)
-main()
+#Report Quarters, only the Selected Quarters of each Year when Given, and the Countries to Read and Report, in Report Order
+def report_selection(args):
+    quarters = report_quarters(args.years, args.trailing_quarters)
+    if args.quarters:
+        quarters = [(year, quarter) for year, quarter in quarters if quarter in args.quarters]
+    countries = [country for country in COUNTRIES if country in (args.countries or COUNTRIES)]
+    return quarters, countries
 
-# Function to find the specifically named Excel file in the script directory
-def find_specific_excel_file(script_dir, filename):
-    excel_file_path = os.path.join(script_dir, filename)
-    if os.path.isfile(excel_file_path):
-        return excel_file_path
-    else:
+#Metrics Cube of the Summary Store when it Holds the Selected Quarters and Countries, was Built with the Current Schemas
+#and no Survey has Changed since,
+#so a Dashboard can Start without Reading the Surveys; None Otherwise
+def stored_cube(argv = None):
+    args = parse_args(argv)
+    if args.no_cache or args.clear_cache:
+        return None
+    script_dir, output_dir = data_dirs(args)
+    stored = read_store(output_dir)
+    if stored is None:
+        return None
+    cube, store = stored
+    quarters, countries = report_selection(args)
+    paths = dict(zip(COUNTRIES, survey_paths(script_dir)))
+    if cube['quarters'] != quarters or cube['countries'] != countries or store.get('schema') != schema_signature():
         return None
+    if any(store['surveys'].get(country) != list(file_stat(paths[country]) or []) for country in countries):
+        return None
+    return cube
+
+#Returns the Metrics Cube, Optionally Writing the Excel File on a Background Thread
+#progress(message, cube) is Called as Stages Finish, with the Cube of the Countries Ready so far, and after each Watch Mode Refresh
+def main(argv = None, background_export = False, progress = None, strict = False):
+    args = parse_args(argv, strict)
+    script_dir, output_dir = data_dirs(args)
+
+    if args.clear_cache:
+        clear_cache(cache_path(script_dir))
+
+    os.makedirs(output_dir, exist_ok = True)
+    if args.format == 'parquet' and not any(importlib.util.find_spec(engine) for engine in ['pyarrow', 'fastparquet']):
+        print("Error: Parquet output needs pyarrow or fastparquet to be installed")
+        sys.exit(1)
+
+    #Stage Timings, Memory Tracing and Profiling for this Run
+    started = time.perf_counter()
+    run = start_run()
+    if args.trace_memory:
+        tracemalloc.start()
+    profiler = start_profiler(args.profile) if args.profile else None
+
+    #Report Quarters and Countries, and the Years of Responses they Need
+    quarters, countries = report_selection(args)
+    if not quarters:
+        print("Error: no report quarters match the selected years and quarters")
+        sys.exit(1)
+    years = sorted(set(year for year, _ in quarters))
 
-# Determine script directory
-if getattr(sys, 'frozen', False):
-    # When running as a bundled executable (e.g., PyInstaller)
-    script_dir = os.path.dirname(sys.executable)
-else:
-    # When running as a script
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Specify the name of the Excel file to search for
-excel_filename = 'NPS Quarterly Summary.xlsx'
-
-# Find the specified Excel file in the script directory
-excel_file_path = find_specific_excel_file(script_dir, excel_filename)
-
-# Check if the file was found
-if excel_file_path is None:
-    raise ValueError(f"Excel file '{excel_filename}' not found in the script directory: {script_dir}")
-
-# Load the Excel file
-excel_data = pd.ExcelFile(excel_file_path)
-sheet_names = excel_data.sheet_names
-displayed_sheet_names = sheet_names[:-3]
-
-# App layout
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='input-sheet-name',
-        options=[{'label': sheet, 'value': sheet} for sheet in displayed_sheet_names],
-        value=displayed_sheet_names[0],
-        clearable=False,  # Prevent clearing the dropdown
-        placeholder="Select a sheet"
-    ),
-    html.Div(id='output-data'),
-    html.Div(id='output-weighted-scores')
-])
+    #Publish each Country's Cube as soon as it is Counted
+    ready_counts = {}
+    def country_ready(position, counts):
+        ready_counts[countries[position]] = counts
+        if progress:
+            progress(f"{countries[position]} ready ({len(ready_counts)} of {len(countries)})",
+                     build_cube({country: ready_counts[country] for country in countries if country in ready_counts}, quarters))
+
+    #Survey Files
+    paths = {country: path for country, path in zip(COUNTRIES, survey_paths(script_dir)) if country in countries}
+
+    #Reads and Filters Files into Dataframes List
+    if progress:
+        progress("Reading survey files...", None)
+    ingest_options = dict(workers = args.workers, use_cache = not args.no_cache, use_hash = args.hash,
+                          incremental = args.incremental, years = years)
+    df, counts, headers, versions = ingest(script_dir, ready = country_ready, countries = countries, **ingest_options)
+    results = dict(zip(countries, zip(df, counts, headers, versions)))
+
+    #Selected Pivot Tables and Raw Sheets of every Country, then the Outputs and Timing Report
+    #The Profile Stops before a Background Export, as a Profiler only Sees its own Thread
+    cache_dir = None if args.no_cache else cache_path(script_dir)
+    def export(cube, started, run, refresh = None, profiler = None):
+        if args.no_export:
+            if profiler:
+                save_profile(profiler, output_dir)
+            return
+        #Summary Store First, so it is Ready for the Dashboards before the Slower Workbook
+        if 'store' in args.outputs:
+            write_store(output_dir, cube, {country: version for country, (_, _, _, version) in results.items()})
+        else:
+            remove_store(output_dir)
+        pivots = {}
+        if 'pivots' in args.outputs:
+            pivots = {country: create_pivot_table(data, found['enquiry_id'], found['executive'], found['rating'],
+                                                  cube = cube, country = country, quarters = quarters)
+                      for country, (data, _, found, _) in results.items()}
+        
+        #Raw Sheets Read with every Column only when Exporting, with the Responses of the Report Quarters as in the Pivots
+        raw = {}
+        if 'raw' in args.outputs:
+            raw = {country: partial(raw_sheet, paths[country], report_rows(data, quarters), found['executive'], cache_dir, version)
+                   for country, (data, _, found, version) in results.items()}
+
+        #Output New Files and the Timing Report
+        export_args = (output_dir, pivots, raw, args.format, args.excel_engine, quarter_labels(quarters))
+        if background_export:
+            if profiler:
+                save_profile(profiler, output_dir)
+            threading.Thread(target = export_with_report, args = (export_args, started, run, refresh)).start()
+        else:
+            export_with_report(export_args, started, run, refresh)
+            if profiler:
+                save_profile(profiler, output_dir)
+
+    #Metrics Cube of every Country
+    cube = build_cube({country: count for country, (_, count, _, _) in results.items()}, quarters)
+    export(cube, started, run, profiler = profiler)
+
+    #Rerun only the Countries whose Survey Changed, Publishing the New Cube before the Export
+    #Latency is from when the First Change was Seen, so at most the Poll plus the Settle Time plus the Rebuild
+    def refresh(positions, changed_at):
+        changed = [countries[position] for position in positions]
+        refresh_started, refresh_run = time.perf_counter(), start_run()
+        try:
+            results.update(zip(changed, zip(*ingest(script_dir, countries = changed, **ingest_options))))
+        except (SystemExit, Exception) as e:
+            print(f"Refresh of {', '.join(changed)} skipped, the survey could not be read ({e}).")
+            return
+        cube = build_cube({country: count for country, (_, count, _, _) in results.items()}, quarters)
+        latency = time.perf_counter() - changed_at
+        message = f"{', '.join(changed)} refreshed {latency:.1f} s after the change was seen"
+        print(message)
+        if progress:
+            progress(message, cube)
+        export(cube, refresh_started, refresh_run, {'countries': changed, 'latency': round(latency, 3), 'settle': args.settle})
+
+    #Watch the Surveys, on a Background Thread when the Export Runs in the Background (as in the Dashboard)
+    if args.watch:
+        print(f"Watching {len(paths)} survey files for changes (settle {args.settle:g} s)...")
+        if background_export:
+            threading.Thread(target = watch_surveys, args = (list(paths.values()), refresh), kwargs = {'settle': args.settle},
+                             daemon = True).start()
+        else:
+            try:
+                watch_surveys(list(paths.values()), refresh, settle = args.settle)
+            except KeyboardInterrupt:
+                print("Stopped watching.")
+
+    return cube
+
+# Initialize the Dash app
+app = dash.Dash(__name__)
+
+# Metrics cube shared with the dashboard, filled in country by country by main()
+metrics_cube = {}
+
+# Progress of the background pipeline, shown while the dashboard starts up
+# The version counts the cubes published, so open sessions redraw when watch mode refreshes the data
+startup_status = {'message': 'Starting up...', 'done': False, 'error': None, 'watching': False, 'version': 0}
+
+# Weights for each rating: the default scores a rating by its value
+RATING_WEIGHTS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
+
+# NPS weighting on the 1-5 scale: promoters (5) count +1, passives (4) 0 and detractors (1-3) -1
+NPS_WEIGHTS = {1: -1, 2: -1, 3: -1, 4: 0, 5: 1}
+
+# Weighting schemes selectable with --weights
+WEIGHT_SCHEMES = {'value': RATING_WEIGHTS, 'nps': NPS_WEIGHTS}
+
+# Weights used for the weighted scores graph, set from --weights at startup
+score_weights = RATING_WEIGHTS
+
+# Function to read a column header such as 5, 5.0 or '5' as a rating, None for other headers
+def rating_label(col_name):
+    try:
+        return float(col_name)
+    except (TypeError, ValueError):
+        return None
 
 # Function to calculate weighted scores
-def calculate_weighted_scores(df):
-    # Example weights (adjust according to your data)
-    weights = {'1': 1, '2': 2, '3': 3, '4': 4, '5': 5}
-    
-    # Initialize an empty list to store weighted scores
-    weighted_scores = []
-
-    # Iterate through each row in the DataFrame
-    for index, row in df.iterrows():
-        # Calculate weighted score for the current row based on available numeric columns
-        weighted_score = 0
-        for col_name in df.columns[1:]:
-            if pd.api.types.is_numeric_dtype(df[col_name]):  # Check if column is numeric
-                weighted_score += row[col_name] * weights.get(str(col_name), 0)
-
-        # Append the weighted score to the list
-        weighted_scores.append(weighted_score)
-    
-    # Add the weighted scores list as a new column to the DataFrame
-    df['Weighted_Score'] = weighted_scores
+def calculate_weighted_scores(df, weights=None):
+    weights = {float(rating): weight for rating, weight in (weights or score_weights).items()}
+
+    # Find the numeric rating columns and their weights once
+    rating_columns = [col_name for col_name in df.columns[1:]
+                      if pd.api.types.is_numeric_dtype(df[col_name]) and rating_label(col_name) in weights]
+    weight_vector = np.array([weights[rating_label(col_name)] for col_name in rating_columns])
+
+    # Weighted score of every row as one matrix-vector product
+    if rating_columns:
+        df['Weighted_Score'] = df[rating_columns].to_numpy() @ weight_vector
+    else:
+        df['Weighted_Score'] = 0
     
     return df
 
-# Callback to update the data based on the input sheet name
-@app.callback(
-    [Output('output-data', 'children'),
-     Output('output-weighted-scores', 'children')],
-    [Input('input-sheet-name', 'value')]
-)
-def update_output(sheet_name):
-    try:
-        # Load the specified sheet into a DataFrame
-        df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
-        
-        # Check if the DataFrame is empty
-        if df.empty:
-            return html.Div([
-                html.H4(f"No Data to Display for {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'})
-            ]), html.Div()
-        
-        # Select only numeric columns and calculate total
-        numeric_df = df.select_dtypes(include=['number'])
-        df['Total'] = numeric_df.sum(axis=1)
-
-        # Annotations for Total Reviews
-        annotations1 = [
-            {
-                'x': x,
-                'y': y + 0.05 * max(df['Total']),  # Adjust y to place annotations above bars
-                'text': str(y),
-                'xref': 'x',
-                'yref': 'y',
-                'showarrow': False,
-                'font': {'size': 10},
-                'align': 'center'
-            }
-            for x, y in zip(df[df.columns[0]], df['Total'])
-        ]
-
-        # Calculate weighted scores
-        df_weighted_scores = calculate_weighted_scores(df)
-
-        # Annotations for Weighted Scores
-        annotations2 = [
-            {
-                'x': x,
-                'y': y + 0.05 * max(df_weighted_scores['Weighted_Score']),  # Adjust y for annotations
-                'text': str(y),
-                'xref': 'x',
-                'yref': 'y',
-                'showarrow': False,
-                'font': {'size': 10},
-                'align': 'center'
-            }
-            for x, y in zip(df[df.columns[0]], df_weighted_scores['Weighted_Score'])
-        ]
-
-        # Create figure for total reviews bar chart
-        fig_total_reviews = {
-            'data': [
-                {'x': df[df.columns[0]], 'y': df['Total'], 'type': 'bar', 'name': 'Total Reviews'},
-            ],
-            'layout': {
-                'title': {
-                    'text': f"Total Reviews for {sheet_name}",
-                    'font': {'size': 24}
-                },
-                'xaxis': {
-                    'title': 'Sales Executives',  # X-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 1  # X-axis tick interval
-                },
-                'yaxis': {
-                    'title': 'Total Reviews',  # Y-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 10  # Y-axis tick interval
-                },
-                'annotations': annotations1  # Annotations for total reviews
-            }
+# Bounded LRU cache of the graphs built for each sheet
+sheet_cache = OrderedDict()
+sheet_cache_size = 32
+sheet_cache_stats = {'hits': 0, 'misses': 0}
+sheet_cache_lock = threading.Lock()
+
+# Function to build the graphs for one sheet
+def build_output(sheet_name):
+    # Slice the specified sheet out of the in-memory metrics cube, the same cube throughout even if a newer one is published meanwhile
+    cube = metrics_cube
+    country, year, months = sheet_selection(sheet_name)
+    df = cube_table(cube, country, year, months)
+    metrics = cube_metrics(cube, country, year, months, weights=score_weights)
+
+    # Check if the DataFrame is empty
+    if df.empty:
+        return html.Div([
+            html.H4(f"No Data to Display for {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'})
+        ]), html.Div()
+
+    # Select only numeric columns and calculate total
+    numeric_df = df.select_dtypes(include=['number'])
+    df['Total'] = numeric_df.sum(axis=1)
+
+    # Annotations for Total Reviews
+    annotations1 = [
+        {
+            'x': x,
+            'y': y + 0.05 * max(df['Total']),  # Adjust y to place annotations above bars
+            'text': str(y),
+            'xref': 'x',
+            'yref': 'y',
+            'showarrow': False,
+            'font': {'size': 10},
+            'align': 'center'
+        }
+        for x, y in zip(df[df.columns[0]], df['Total'])
+    ]
+
+    # Calculate weighted scores
+    df_weighted_scores = calculate_weighted_scores(df)
+
+    # Annotations for Weighted Scores
+    annotations2 = [
+        {
+            'x': x,
+            'y': y + 0.05 * max(df_weighted_scores['Weighted_Score']),  # Adjust y for annotations
+            'text': str(y),
+            'xref': 'x',
+            'yref': 'y',
+            'showarrow': False,
+            'font': {'size': 10},
+            'align': 'center'
         }
+        for x, y in zip(df[df.columns[0]], df_weighted_scores['Weighted_Score'])
+    ]
+
+    # Create figure for total reviews bar chart
+    fig_total_reviews = {
+        'data': [
+            {'x': df[df.columns[0]], 'y': df['Total'], 'type': 'bar', 'name': 'Total Reviews'},
+        ],
+        'layout': {
+            'title': {
+                'text': f"Total Reviews for {sheet_name}",
+                'font': {'size': 24}
+            },
+            'xaxis': {
+                'title': 'Sales Executives',  # X-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 1  # X-axis tick interval
+            },
+            'yaxis': {
+                'title': 'Total Reviews',  # Y-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 10  # Y-axis tick interval
+            },
+            'annotations': annotations1  # Annotations for total reviews
+        }
+    }
+
+    # Create figure for weighted scores bar chart
+    fig_weighted_scores = {
+        'data': [
+            {'x': df[df.columns[0]], 'y': df_weighted_scores['Weighted_Score'], 'type': 'bar', 'name': 'Weighted Scores'},
+        ],
+        'layout': {
+            'title': {
+                'text': f"Weighted Scores for {sheet_name}",
+                'font': {'size': 24}
+            },
+            'xaxis': {
+                'title': 'Sales Executives',  # X-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 1  # X-axis tick interval
+            },
+            'yaxis': {
+                'title': 'Weighted Scores',  # Y-axis title
+                'tickmode': 'linear',
+                'tick0': 0,
+                'dtick': 50  # Y-axis tick interval
+            },
+            'annotations': annotations2  # Annotations for weighted scores
+        }
+    }
+
+    return (
+        html.Div([
+            html.H4(f"Data from {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'}),
+            html.P(f"{metrics['total']} reviews, NPS {metrics['nps']:.1f}, {metrics['promoter_share']:.1f}% promoters",
+                   style={'textAlign': 'center', 'fontSize': '18px'}),
+            dcc.Graph(id='total-reviews', figure=fig_total_reviews)
+        ]),
+        dcc.Graph(id='weighted-scores', figure=fig_weighted_scores)
+    )
+
+# Function to show an error in place of a sheet's graphs
+def error_output(error):
+    return html.Div([
+        html.H4(f"Error: {str(error)}", style={'textAlign': 'center', 'fontSize': '24px'})
+    ]), html.Div()
+
+# Callback to update the data based on the input sheet name, and again when a newer cube is published
+@instrument('update_output')
+def update_output(sheet_name, version=None):
+    # Nothing to show until the first country is ready
+    if sheet_name is None:
+        return html.Div(), html.Div()
 
-        # Create figure for weighted scores bar chart
-        fig_weighted_scores = {
-            'data': [
-                {'x': df[df.columns[0]], 'y': df_weighted_scores['Weighted_Score'], 'type': 'bar', 'name': 'Weighted Scores'},
-            ],
-            'layout': {
-                'title': {
-                    'text': f"Weighted Scores for {sheet_name}",
-                    'font': {'size': 24}
-                },
-                'xaxis': {
-                    'title': 'Sales Executives',  # X-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 1  # X-axis tick interval
-                },
-                'yaxis': {
-                    'title': 'Weighted Scores',  # Y-axis title
-                    'tickmode': 'linear',
-                    'tick0': 0,
-                    'dtick': 50  # Y-axis tick interval
-                },
-                'annotations': annotations2  # Annotations for weighted scores
-            }
+    start = time.perf_counter()
+    try:
+        with sheet_cache_lock:
+            output = sheet_cache.get(sheet_name)
+            if output is not None:
+                # Serve the sheet from the cache and mark it as recently used
+                sheet_cache.move_to_end(sheet_name)
+                sheet_cache_stats['hits'] += 1
+            version = startup_status['version']
+
+        if output is None:
+            # Build the sheet outside the lock so other sessions are not held up
+            output = build_output(sheet_name)
+            with sheet_cache_lock:
+                sheet_cache_stats['misses'] += 1
+                # Cache it unless a newer cube was published meanwhile, dropping the least recently used sheet when full
+                if startup_status['version'] == version:
+                    sheet_cache[sheet_name] = output
+                    if len(sheet_cache) > sheet_cache_size:
+                        sheet_cache.popitem(last=False)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{sheet_name} shown in {elapsed:.1f} ms (sheet cache: {sheet_cache_stats['hits']} hits, {sheet_cache_stats['misses']} misses)")
+        return output
+    except Exception as e:
+        return error_output(e)
+
+# Graphs of every sheet for the newest cube, shipped to the browser in client-side mode
+payload_cache = {'version': None, 'payloads': {}}
+
+# Callback to build every sheet's graphs once per published cube, so switching sheets in the browser needs no server work
+@instrument('update_payloads')
+def update_payloads(version=None):
+    start = time.perf_counter()
+    with sheet_cache_lock:
+        current_version = startup_status['version']
+        if payload_cache['version'] == current_version:
+            return payload_cache['payloads']
+        displayed_sheet_names = cube_sheet_names(metrics_cube) if metrics_cube else []
+
+    payloads = {}
+    for sheet_name in displayed_sheet_names:
+        try:
+            payloads[sheet_name] = list(build_output(sheet_name))
+        except Exception as e:
+            payloads[sheet_name] = list(error_output(e))
+
+    # Keep them unless a newer cube was published meanwhile
+    with sheet_cache_lock:
+        if startup_status['version'] == current_version:
+            payload_cache.update(version=current_version, payloads=payloads)
+    print(f"{len(payloads)} sheets prepared for the browser in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return payloads
+
+# Function to register how a selected sheet is shown: rebuilt on the server on every change,
+# or in client-side mode looked up in the browser from the graphs of every sheet shipped once per cube
+def register_output_callbacks(client_side=False):
+    outputs = [Output('output-data', 'children'), Output('output-weighted-scores', 'children')]
+    if not client_side:
+        app.callback(outputs, [Input('input-sheet-name', 'value'), Input('cube-version', 'data')])(update_output)
+        return
+    app.callback(Output('sheet-payloads', 'data'), [Input('cube-version', 'data')])(update_payloads)
+    app.clientside_callback(
+        """
+        function(sheet_name, payloads) {
+            var payload = sheet_name && payloads ? payloads[sheet_name] : null;
+            return payload || [null, null];
         }
+        """,
+        outputs,
+        [Input('input-sheet-name', 'value'), Input('sheet-payloads', 'data')]
+    )
+
+# Function to swap in a newer metrics cube and drop the graphs built from the old one
+# The cube is replaced rather than updated, so callbacks building from the old one are not disturbed
+def publish_cube(cube):
+    global metrics_cube
+    with sheet_cache_lock:
+        metrics_cube = dict(cube)
+        sheet_cache.clear()
+        startup_status['version'] += 1
 
-        return (
-            html.Div([
-                html.H4(f"Data from {sheet_name}", style={'textAlign': 'center', 'fontSize': '24px'}),
-                dcc.Graph(id='total-reviews', figure=fig_total_reviews)
-            ]),
-            dcc.Graph(id='weighted-scores', figure=fig_weighted_scores)
-        )
+# Function to record pipeline progress, publishing each country's views as soon as they are ready
+def report_progress(message, cube):
+    startup_status['message'] = message
+    if cube is not None:
+        publish_cube(cube)
+
+# Function to load the summary store, or run the Excel pipeline in the background while the dashboard is already up
+def load_data(argv=None):
+    start = time.perf_counter()
+    try:
+        # Start from the summary store when no survey changed since it was written, unless the surveys are watched
+        cube = None if startup_status['watching'] else stored_cube(argv)
+        if cube is not None:
+            publish_cube(cube)
+            startup_status['message'] = f"Summary loaded in {(time.perf_counter() - start) * 1000:.1f} ms"
+        else:
+            # Create Excel File in the Background and Keep the Metrics Cube in Memory
+            publish_cube(main(argv, background_export=True, progress=report_progress))
+            startup_status['message'] = f"All data loaded in {time.perf_counter() - start:.1f} s"
+    except SystemExit:
+        startup_status['error'] = "Survey files could not be read, see the console for details"
     except Exception as e:
-        return html.Div([
-            html.H4(f"Error: {str(e)}", style={'textAlign': 'center', 'fontSize': '24px'})
-        ]), html.Div()
+        startup_status['error'] = str(e)
+    startup_status['done'] = True
+
+# Callback to show loading progress and add each country's sheets as they become available
+# In watch mode it keeps polling, and bumps the session's cube version after each refresh
+@app.callback(
+    [Output('loading-status', 'children'),
+     Output('input-sheet-name', 'options'),
+     Output('input-sheet-name', 'value'),
+     Output('startup-poll', 'disabled'),
+     Output('cube-version', 'data')],
+    [Input('startup-poll', 'n_intervals')],
+    [State('input-sheet-name', 'value'),
+     State('cube-version', 'data')]
+)
+@instrument('update_startup')
+def update_startup(n_intervals, sheet_name, version=None):
+    with sheet_cache_lock:
+        displayed_sheet_names = cube_sheet_names(metrics_cube) if metrics_cube else []
+        current_version = startup_status['version']
+
+    if startup_status['error']:
+        status = f"Error: {startup_status['error']}"
+    elif startup_status['done'] and startup_status['watching']:
+        status = f"{startup_status['message']} (watching the survey files for changes)"
+    elif startup_status['done']:
+        status = startup_status['message']
+    else:
+        status = f"Loading survey data: {startup_status['message']}"
+
+    # Keep the selected sheet, or select the first one once it exists
+    if sheet_name in displayed_sheet_names or not displayed_sheet_names:
+        value = dash.no_update
+    else:
+        value = displayed_sheet_names[0]
+
+    options = [{'label': sheet, 'value': sheet} for sheet in displayed_sheet_names]
+    version = dash.no_update if version == current_version else current_version
+    return status, options, value, startup_status['done'] and not startup_status['watching'], version
+
+# Function to pick the port for the Dash server: the preferred one when free, otherwise any free port
+def find_free_port(preferred_port=8050):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', preferred_port))
+        except OSError:
+            sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+# Health endpoint polled before the window opens
+@app.server.route('/health')
+def health():
+    return 'ok'
+
+# Loading status and sheet names of this worker as JSON, for load tests and monitoring
+@app.server.route('/status')
+def status():
+    with sheet_cache_lock:
+        sheets = cube_sheet_names(metrics_cube) if metrics_cube else []
+    report = dict(startup_status, sheets=sheets, sheet_cache=dict(sheet_cache_stats), pid=os.getpid())
+    return app.server.response_class(json.dumps(report), mimetype='application/json')
+
+# Stage and callback timings of this session as JSON, totals first
+@app.server.route('/timings')
+def timings():
+    with stage_lock:
+        records = list(stage_log)
+    report = {'summary': summarize_stages(records), 'stages': records}
+    return app.server.response_class(json.dumps(report, indent=2), mimetype='application/json')
 
 # Function to start Dash server
-def run_dash():
-    app.run_server(debug=False, port=8050, use_reloader=False)
-
-# Function to create webview window after a delay
-def create_webview_with_delay(delay_seconds):
-    time.sleep(delay_seconds)  # Delay for specified seconds
-    width=screen_width,
-    height=screen_height,
-    webview.create_window("Dash App", "http://127.0.0.1:8050/", width=screen_width, height=screen_height, resizable=True)
-    webview.start()
+def run_dash(port):
+    app.run(debug=False, port=port, use_reloader=False)
 
-monitor = get_monitors()[0]  # Assumes single monitor setup
-screen_width = monitor.width
-screen_height = monitor.height
+# Function to serve the dashboard to several browsers with waitress, or with Flask's threaded server when waitress is not installed
+def serve_dashboard(host, port, threads=8):
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress is not installed, serving with the Flask development server instead.")
+        app.run(debug=False, host=host, port=port, use_reloader=False, threaded=True)
+    else:
+        serve(app.server, host=host, port=port, threads=threads)
+
+# Dashboard server options, besides the pipeline options passed on to main()
+def parse_server_args(argv=None):
+    parser = argparse.ArgumentParser(description='NPS dashboard.', add_help=False)
+    parser.add_argument('--no-webview', action='store_true', help='Serve the dashboard to browsers instead of opening a window')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to serve on, e.g. 0.0.0.0 for other computers')
+    parser.add_argument('--port', type=int, help='Port to serve on (default: 8050, or any free port for the window)')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads of the waitress server')
+    parser.add_argument('--weights', choices=list(WEIGHT_SCHEMES), default='value',
+                        help='Score each rating by its value, or with NPS weighting (promoters +1, passives 0, detractors -1)')
+    parser.add_argument('--client-side', action='store_true',
+                        help='Ship every sheet\'s graphs to the browser once, so switching sheets needs no server round trip')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+# App layout, shown with a loading state while the data is read in the background
+# In client-side mode it also holds the graphs of every sheet
+def dashboard_layout(client_side=False):
+    return html.Div([
+        html.Div(id='loading-status', children="Loading survey data...", style={'textAlign': 'center', 'fontSize': '18px'}),
+        dcc.Dropdown(
+            id='input-sheet-name',
+            options=[],
+            value=None,
+            clearable=False,  # Prevent clearing the dropdown
+            placeholder="Select a sheet"
+        ),
+        html.Div(id='output-data'),
+        html.Div(id='output-weighted-scores'),
+        dcc.Interval(id='startup-poll', interval=500),  # Polls the pipeline until every country is ready, or for refreshes in watch mode
+        dcc.Store(id='cube-version')
+    ] + ([dcc.Store(id='sheet-payloads')] if client_side else []))
+
+# Function to read, clean and export the data on a background thread
+def start_loading(argv=None):
+    # Keep polling after startup when the survey files are watched
+    startup_status['watching'] = parse_args(argv).watch
+    data_thread = threading.Thread(target=load_data, args=(argv,))
+    data_thread.start()
+
+# WSGI entry point for multi-process servers, e.g. gunicorn -w 4 -b 0.0.0.0:8050 "NPS:create_server()"
+# Every worker process reads the surveys and keeps its own metrics cube and sheet cache, and only the cube is built
+def create_server(*argv):
+    global score_weights
+    server_args = parse_server_args(list(argv))
+    client_side = server_args.client_side
+    score_weights = WEIGHT_SCHEMES[server_args.weights]
+    register_output_callbacks(client_side)
+    app.layout = dashboard_layout(client_side)
+    start_loading(list(argv) + ['--no-export'])
+    return app.server
+
+# Function to wait until the Dash server answers its health endpoint, False after the timeout
+def wait_for_server(url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url + 'health', timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+# Function to create webview window as soon as the server accepts connections
+def create_webview_when_ready(url, start_time, timeout=30):
+    if wait_for_server(url, timeout):
+        print(f"Dashboard ready at {url} in {time.perf_counter() - start_time:.2f} s")
+    else:
+        print(f"Dashboard not ready after {timeout} s, opening {url} anyway")
+    import webview  # Loaded here so startup does not wait for the GUI backend
+    webview.create_window("Dash App", url, width=screen_width, height=screen_height, resizable=True)
+    webview.start()
 
 # Entry point of the script
 if __name__ == '__main__':
-    dash_thread = threading.Thread(target=run_dash)
-    dash_thread.start()
+    start_time = time.perf_counter()
+
+    # Lets Worker Processes Start inside the Bundled Executable
+    multiprocessing.freeze_support()
+
+    server_args = parse_server_args()
+    score_weights = WEIGHT_SCHEMES[server_args.weights]
+    register_output_callbacks(server_args.client_side)
+    app.layout = dashboard_layout(server_args.client_side)
+
+    if server_args.no_webview:
+        # Server mode: read the data in the background and serve browsers until stopped
+        start_loading()
+        port = server_args.port or 8050
+        print(f"Serving the dashboard at http://{server_args.host}:{port}/")
+        serve_dashboard(server_args.host, port, server_args.threads)
+    else:
+        # Start the server on 8050, or on a free port when 8050 is busy
+        port = server_args.port or find_free_port()
+        dash_thread = threading.Thread(target=run_dash, args=(port,))
+        dash_thread.start()
+
+        # Read, clean and export the data while the window is already open
+        start_loading()
+
+        # Size the window to the screen while the server starts
+        from screeninfo import get_monitors
+        monitor = get_monitors()[0]  # Assumes single monitor setup
+        screen_width = monitor.width
+        screen_height = monitor.height
 
-    # Delay webview creation to ensure server is up
-    create_webview_with_delay(delay_seconds=0)  # Adjust delay as needed
+        # Open the window once the server is up
+        create_webview_when_ready(f"http://127.0.0.1:{port}/", start_time)